@@ -0,0 +1,279 @@
+import numpy as np
+
+from scoring import ScoreBoard, NO_VOTE
+
+VOTE_VALUES = 11  # votes go from 0 to 10
+# sorts after every vote, for the missing votes of a cell
+MISSING = np.int8(127)
+
+
+class Aggregator:
+    # Turns the votes of each (player, judgement) cell into a score. cell()
+    # is the streaming path: it reads state kept up to date on every vote,
+    # bounded per cell. cells() is the batch path over the whole board.
+    listens = False
+
+    def __init__(self):
+        self.board = None  # type: ScoreBoard
+
+    def attach(self, board: ScoreBoard):
+        self.board = board
+        if self.listens:
+            board.listeners.append(self)
+        self.rebuild()
+
+    def detach(self):
+        if self.board is not None and self in self.board.listeners:
+            self.board.listeners.remove(self)
+        self.board = None
+
+    def rebuild(self):
+        pass
+
+    def vote(self, player: int, judgement: int, jury: int, previous: int):
+        pass
+
+    def cell(self, player: int, judgement: int) -> float:
+        raise NotImplementedError
+
+    def cells(self):
+        raise NotImplementedError
+
+    def finals(self):
+        return self.cells().mean(axis=1)
+
+
+class Mean(Aggregator):
+    def cell(self, player, judgement):
+        return self.board.cell_mean(player, judgement)
+
+    def cells(self):
+        return self.board.cell_means()
+
+
+def _sorted_votes(board: ScoreBoard):
+    # the votes of each cell in increasing order, missing votes last
+    return np.sort(np.where(board.voted, board.votes, MISSING), axis=2)
+
+
+class _HistogramAggregator(Aggregator):
+    # order statistics from an 11 bin histogram per cell
+    listens = True
+
+    def rebuild(self):
+        board = self.board
+        cells = board.count.size
+        votes = board.votes.reshape(cells, -1)
+        bins = np.arange(cells)[:, None] * VOTE_VALUES + votes
+        self.histogram = np.bincount(
+            bins[votes != NO_VOTE], minlength=cells * VOTE_VALUES
+        ).astype(np.int32).reshape(board.count.shape + (VOTE_VALUES,))
+
+    def vote(self, player, judgement, jury, previous):
+        histogram = self.histogram[player, judgement]
+        if previous != NO_VOTE:
+            histogram[previous] -= 1
+        vote = int(self.board.votes[player, judgement, jury])
+        if vote != NO_VOTE:
+            histogram[vote] += 1
+
+    def _ranked(self, player, judgement, start, stop):
+        # sum of the votes ranked start to stop - 1 in the cell
+        total = 0
+        rank = 0
+        for value, count in enumerate(self.histogram[player, judgement]):
+            if not count:
+                continue
+            low, high = max(rank, start), min(rank + count, stop)
+            if high > low:
+                total += (high - low) * value
+            rank += count
+            if rank >= stop:
+                break
+        return total
+
+
+class Median(_HistogramAggregator):
+    def cell(self, player, judgement):
+        count = int(self.board.count[player, judgement])
+        if not count:
+            return 0.
+        middle = (count - 1) // 2
+        return self._ranked(
+            player, judgement, middle, count - middle
+        ) / (count - 2 * middle)
+
+    def cells(self):
+        board = self.board
+        ordered = _sorted_votes(board)
+        count = board.count.astype(np.int64)
+        lower = np.maximum(count - 1, 0) // 2
+        upper = count // 2
+        median = (
+            np.take_along_axis(ordered, lower[..., None], axis=2)
+            + np.take_along_axis(ordered, upper[..., None], axis=2)
+        )[..., 0] / 2
+        return np.where(count > 0, median, 0.)
+
+
+class TrimmedMean(_HistogramAggregator):
+    # mean without the given share of lowest and of highest votes
+    def __init__(self, proportion=.2):
+        super().__init__()
+        if not 0 <= proportion < .5:
+            raise ValueError("the trimmed proportion must be in [0, 0.5)")
+        self.proportion = proportion
+
+    def cell(self, player, judgement):
+        count = int(self.board.count[player, judgement])
+        if not count:
+            return 0.
+        cut = int(count * self.proportion)
+        return self._ranked(
+            player, judgement, cut, count - cut
+        ) / (count - 2 * cut)
+
+    def cells(self):
+        board = self.board
+        ordered = _sorted_votes(board).astype(np.int64)
+        ordered[ordered == MISSING] = 0
+        count = board.count.astype(np.int64)
+        cut = (count * self.proportion).astype(np.int64)
+        running = np.concatenate(
+            (np.zeros(count.shape + (1,), dtype=np.int64),
+             ordered.cumsum(axis=2)), axis=2
+        )
+        kept = np.take_along_axis(running, (count - cut)[..., None], axis=2) \
+            - np.take_along_axis(running, cut[..., None], axis=2)
+        return np.divide(
+            kept[..., 0], count - 2 * cut, out=np.zeros(count.shape),
+            where=count > 0
+        )
+
+
+class BayesianAverage(Aggregator):
+    # the cell mean shrunk toward the mean of all votes, as if every cell
+    # had `weight` more votes at the prior
+    listens = True
+
+    def __init__(self, weight=5., prior=None):
+        super().__init__()
+        if weight < 0:
+            raise ValueError("the prior weight must be positive")
+        self.weight = weight
+        self.fixed_prior = prior
+
+    def rebuild(self):
+        self.total = int(self.board.sum.sum())
+        self.total_count = int(self.board.count.sum())
+
+    def vote(self, player, judgement, jury, previous):
+        if previous != NO_VOTE:
+            self.total -= previous
+            self.total_count -= 1
+        vote = int(self.board.votes[player, judgement, jury])
+        if vote != NO_VOTE:
+            self.total += vote
+            self.total_count += 1
+
+    @property
+    def prior(self):
+        if self.fixed_prior is not None:
+            return self.fixed_prior
+        return self.total / self.total_count if self.total_count else 5.
+
+    def cell(self, player, judgement):
+        board = self.board
+        return (self.weight * self.prior + int(board.sum[player, judgement])) \
+            / (self.weight + int(board.count[player, judgement]) or 1)
+
+    def cells(self):
+        board = self.board
+        denominator = self.weight + board.count
+        return np.divide(
+            self.weight * self.prior + board.sum, denominator,
+            out=np.zeros(board.count.shape), where=denominator > 0
+        )
+
+
+class ZScore(Aggregator):
+    # Every vote is standardized against its juror's own mean and spread,
+    # then the mean z-score of a cell is put back on the vote scale. A juror
+    # who always votes alike counts as neutral.
+    listens = True
+
+    def rebuild(self):
+        board = self.board
+        voted = board.voted
+        values = np.where(voted, board.votes, 0).astype(np.int64)
+        self.jury_count = voted.sum(axis=(0, 1))
+        self.jury_sum = values.sum(axis=(0, 1))
+        self.jury_sum_sq = (values ** 2).sum(axis=(0, 1))
+
+    def vote(self, player, judgement, jury, previous):
+        if previous != NO_VOTE:
+            self.jury_count[jury] -= 1
+            self.jury_sum[jury] -= previous
+            self.jury_sum_sq[jury] -= previous * previous
+        vote = int(self.board.votes[player, judgement, jury])
+        if vote != NO_VOTE:
+            self.jury_count[jury] += 1
+            self.jury_sum[jury] += vote
+            self.jury_sum_sq[jury] += vote * vote
+
+    def _scales(self):
+        # (mean, deviation) of each juror and of all votes
+        count = np.maximum(self.jury_count, 1)
+        means = self.jury_sum / count
+        deviations = np.sqrt(np.maximum(
+            self.jury_sum_sq / count - means ** 2, 0.
+        ))
+        total = max(int(self.jury_count.sum()), 1)
+        mean = self.jury_sum.sum() / total
+        deviation = np.sqrt(max(self.jury_sum_sq.sum() / total - mean ** 2,
+                                0.))
+        return means, deviations, mean, deviation
+
+    @staticmethod
+    def _z(votes, voted, means, deviations):
+        return np.divide(
+            votes - means, deviations, out=np.zeros(np.broadcast(
+                votes, means).shape), where=voted & (deviations > 0)
+        )
+
+    def cell(self, player, judgement):
+        count = int(self.board.count[player, judgement])
+        if not count:
+            return 0.
+        means, deviations, mean, deviation = self._scales()
+        votes = self.board.votes[player, judgement]
+        z = self._z(votes, votes != NO_VOTE, means, deviations)
+        return float(mean + deviation * z.sum() / count)
+
+    def cells(self):
+        board = self.board
+        means, deviations, mean, deviation = self._scales()
+        z = self._z(board.votes, board.voted, means, deviations)
+        return np.where(
+            board.count > 0,
+            mean + deviation * z.sum(axis=2) / np.maximum(board.count, 1), 0.
+        )
+
+
+strategies = {
+    "mean": Mean,
+    "median": Median,
+    "trimmed": TrimmedMean,
+    "bayesian": BayesianAverage,
+    "zscore": ZScore,
+}
+
+
+def make_aggregator(spec: str) -> Aggregator:
+    # "name[:parameter]", the parameter of trimmed and bayesian only
+    name, _, parameter = spec.partition(":")
+    if name not in strategies:
+        raise ValueError(f"unknown aggregation {name!r}")
+    if parameter:
+        return strategies[name](float(parameter))
+    return strategies[name]()
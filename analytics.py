@@ -0,0 +1,102 @@
+import numpy as np
+
+from scoring import ScoreBoard, NO_VOTE
+
+
+class BiasTracker:
+    def __init__(self, board: ScoreBoard, jury_players=None):
+        self.board = board
+        player_number, _, jury_number = board.shape
+        # player id of each juror, -1 when the juror does not play
+        self.jury_players = np.full(jury_number, -1, dtype=np.int64)
+        if jury_players is not None:
+            self.jury_players[:] = jury_players
+        self.rebuild()
+
+    def rebuild(self):
+        board = self.board
+        player_number, _, jury_number = board.shape
+        voted = board.voted
+        self._means = board.cell_means()
+        # residual of every vote against the mean of its cell
+        residuals = np.where(
+            voted, board.votes - self._means[:, :, None], 0.
+        )
+        self._residuals = residuals.sum(axis=(0, 1))
+        self._counts = voted.sum(axis=(0, 1))
+        self._player_residuals = residuals.sum(axis=1).T
+        self._player_counts = voted.sum(axis=1).T
+
+    def vote(self, player: int, judgement: int, jury: int, previous: int):
+        cell = self.board.votes[player, judgement].astype(np.int64)
+        old_cell = cell.copy()
+        old_cell[jury] = previous
+        mean = self.board.cell_mean(player, judgement)
+        # swap the residuals of the whole cell: its mean moved
+        delta = np.where(cell != NO_VOTE, cell - mean, 0.) - np.where(
+            old_cell != NO_VOTE, old_cell - self._means[player, judgement],
+            0.
+        )
+        self._means[player, judgement] = mean
+        self._residuals += delta
+        self._player_residuals[:, player] += delta
+        # +1 for a new vote, -1 for a vote taken back
+        change = int(cell[jury] != NO_VOTE) - int(previous != NO_VOTE)
+        if change:
+            self._counts[jury] += change
+            self._player_counts[jury, player] += change
+
+    def leniency(self):
+        return np.divide(
+            self._residuals, self._counts,
+            out=np.zeros(len(self._counts)), where=self._counts > 0
+        )
+
+    def favoritism(self):
+        # (jury, players), NaN where the juror never rated the player
+        per_player = np.divide(
+            self._player_residuals, self._player_counts,
+            out=np.full(self._player_counts.shape, np.nan),
+            where=self._player_counts > 0
+        )
+        return per_player - self.leniency()[:, None]
+
+    def self_inflation(self):
+        # (jury,), NaN for jurors who do not play
+        inflation = np.full(len(self.jury_players), np.nan)
+        playing = np.flatnonzero(self.jury_players >= 0)
+        inflation[playing] = self.favoritism()[
+            playing, self.jury_players[playing]
+        ]
+        return inflation
+
+    def agreement(self):
+        # Krippendorff's alpha, interval metric, from the cell accumulators
+        board = self.board
+        pairable = board.count >= 2
+        count = board.count[pairable].astype(float)
+        sums = board.sum[pairable].astype(float)
+        sums_sq = board.sum_sq[pairable].astype(float)
+        total = count.sum()
+        if total < 2:
+            return float("nan")
+        observed = (
+            2 * (count * sums_sq - sums ** 2) / (count - 1)
+        ).sum() / total
+        expected = 2 * (total * sums_sq.sum() - sums.sum() ** 2) / (
+            total * (total - 1)
+        )
+        if expected == 0:
+            return float("nan")
+        return 1 - observed / expected
+
+    def corrected_means(self):
+        board = self.board
+        offsets = np.tensordot(board.voted, self.leniency(), axes=1)
+        return np.divide(
+            board.sum - offsets, board.count,
+            out=np.zeros(board.count.shape), where=board.count > 0
+        )
+
+    def corrected_finals(self):
+        return self.corrected_means().mean(axis=1)
@@ -1,12 +1,25 @@
 from constants import *
 
-menu_buttons = [GAME, SETTINGS, EXIT]
-settings_buttons = [JUDGEMENTS, BACK]
+menu_buttons = [GAME, JOIN, SETTINGS, EXIT]
+settings_buttons = [JUDGEMENTS, DEBUG, BACK]
 
 buttons_names = {
     GAME: "Jeu rapide",
+    JOIN: "Rejoindre",
     SETTINGS: "Paramètres",
     EXIT: "Quitter",
     JUDGEMENTS: "Jugements",
+    DEBUG: "Mode débogage",
     BACK: "Retour",
 }
+
+# score aggregations offered on the end screen, see aggregators.strategies
+aggregation_buttons = ["mean", "median", "trimmed", "bayesian", "zscore"]
+
+aggregation_names = {
+    "mean": "Moyenne",
+    "median": "Médiane",
+    "trimmed": "Tronquée",
+    "bayesian": "Bayésienne",
+    "zscore": "Z-score",
+}
@@ -0,0 +1,363 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from itertools import chain, groupby, islice, repeat
+from multiprocessing import Pool
+
+import numpy as np
+
+from game import Game
+from ranking import leaderboards, standings
+from votes import VoteLog
+
+# JSON lines parsed, checked and packed at once
+CHUNK = 1 << 16
+# characters of CSV read at once, rounded up to a whole line
+BLOCK = 1 << 20
+FIELDS = ("player", "judgement", "jury", "vote")
+# ids are stored on 16 bits
+MAX_NAMES = 1 << 16
+
+
+class Session:
+    # The votes of one session while it is read: a name table per roster
+    # and the votes as ids, 7 bytes a vote.
+    def __init__(self, source, key):
+        self.source = source
+        self.key = key
+        self.players = dict()
+        self.jury = dict()
+        self.judgements = dict()
+        self.log = VoteLog()
+
+    def add(self, players, judgements, jury, votes):
+        self.log.extend(
+            _ids(self.players, players), _ids(self.judgements, judgements),
+            _ids(self.jury, jury), votes
+        )
+
+    def job(self, aggregation):
+        # what a worker needs to score the session, cheap to pickle
+        return (self.source, self.key, list(self.players), list(self.jury),
+                list(self.judgements), self.log.tobytes(), aggregation)
+
+
+def _ids(table, names):
+    # new names are numbered once each, then every row is a C level lookup
+    for name in dict.fromkeys(names):
+        if name not in table:
+            table[name] = len(table)
+    if len(table) > MAX_NAMES:
+        raise ValueError(f"more than {MAX_NAMES} names in a session")
+    return np.fromiter(map(table.__getitem__, names), dtype=np.uint16,
+                       count=len(names))
+
+
+def _votes(values, line):
+    # the votes of a chunk as int8, checked at once, the first bad row is
+    # looked for only when there is one
+    try:
+        votes = np.fromiter(map(int, values), dtype=np.int64,
+                            count=len(values))
+        if not len(votes) or (votes.min() >= 0 and votes.max() <= 10):
+            return votes.astype(np.int8)
+    except (ValueError, TypeError, OverflowError):
+        pass
+    for offset, value in enumerate(values):
+        if not (isinstance(value, (str, int)) and not isinstance(value, bool)
+                and str(value).strip().isdigit() and int(value) <= 10):
+            raise ValueError(
+                f"line {line + offset}: invalid vote {value!r}, votes are "
+                f"whole numbers from 0 to 10"
+            )
+    raise ValueError(f"line {line}: invalid votes")
+
+
+def _csv_rows(text, width, line):
+    # the rows of a block of lines, through the csv module for quoted fields
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    for offset, row in enumerate(rows):
+        if len(row) != width:
+            raise ValueError(
+                f"line {line + offset}: {len(row)} fields instead of {width}"
+            )
+    return rows, list(zip(*rows))
+
+
+def read_csv(file, first=None):
+    # (first line, sessions, players, judgements, jury, votes) column
+    # chunks, the session column is optional. Blocks of lines without any
+    # quote are split in one go, every field of the block in a single list
+    # that is then sliced into columns.
+    if first is None:
+        first = file.readline()
+    header = next(csv.reader([first]), None)
+    if header is None:
+        return
+    try:
+        columns = [header.index(field) for field in FIELDS]
+    except ValueError:
+        raise ValueError(
+            f"the CSV header must name the {', '.join(FIELDS)} columns"
+        ) from None
+    session = header.index("session") if "session" in header else None
+    width = len(header)
+    line = 2
+    while True:
+        text = file.read(BLOCK)
+        if not text:
+            return
+        if not text.endswith("\n"):
+            text += file.readline()
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        text = text.strip("\n")
+        while "\n\n" in text:
+            # blank lines are skipped
+            text = text.replace("\n\n", "\n")
+        if not text:
+            continue
+        count = text.count("\n") + 1
+        fields = None
+        # every line must have its own width - 1 commas, ragged lines that
+        # add up to whole rows would shift the columns
+        if '"' not in text and all(map(
+            (width - 1).__eq__, map(str.count, text.split("\n"), repeat(","))
+        )):
+            fields = text.replace("\n", ",").split(",")
+        if fields is None:
+            rows, fields = _csv_rows(text, width, line)
+            count = len(rows)
+            columns_of = fields.__getitem__
+        else:
+            def columns_of(i, fields=fields):
+                return fields[i::width]
+        sessions = columns_of(session) if session is not None \
+            else [""] * count
+        yield (line, sessions) + tuple(columns_of(i) for i in columns)
+        line += count
+
+
+def read_jsonl(file):
+    # the same chunks from one JSON object per line
+    line = 1
+    while True:
+        lines = list(islice(file, CHUNK))
+        if not lines:
+            return
+        records = list()
+        for offset, text in enumerate(lines):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+                records.append((record.get("session", ""),) + tuple(
+                    record[field] for field in FIELDS
+                ))
+            except (ValueError, KeyError, AttributeError):
+                raise ValueError(
+                    f"line {line + offset}: expected an object with "
+                    f"{', '.join(FIELDS)}"
+                ) from None
+            if type(records[-1][-1]) not in (int, str):
+                # int() would truncate 7.5 or read true as 1
+                raise ValueError(
+                    f"line {line + offset}: invalid vote "
+                    f"{records[-1][-1]!r}, votes are whole numbers from 0 "
+                    f"to 10"
+                )
+        if records:
+            yield (line,) + tuple(zip(*records))
+        line += len(lines)
+
+
+def read(file):
+    # CSV or JSON lines, told apart by the first character
+    first = file.readline()
+    if first.lstrip().startswith("{"):
+        return read_jsonl(chain([first], file))
+    return read_csv(file, first)
+
+
+def _runs(sessions):
+    # (session, rows) of each run of equal sessions: in a sorted chunk the
+    # runs are found by C level scans, then checked in a single comparison.
+    # Keys come in order of first row, each scan starts where the previous
+    # run did so that the chunk is scanned once whatever its sessions.
+    sessions = list(sessions)
+    keys = list(dict.fromkeys(sessions))
+    starts = list()
+    start = 0
+    for key in keys:
+        start = sessions.index(key, start)
+        starts.append(start)
+    starts.append(len(sessions))
+    runs = [(key, stop - start)
+            for key, start, stop in zip(keys, starts, starts[1:])]
+    expected = list()
+    for key, length in runs:
+        expected += [key] * max(length, 0)
+    if expected == sessions:
+        return runs
+    return [(key, sum(1 for _ in rows)) for key, rows in groupby(sessions)]
+
+
+def read_sessions(file, source=""):
+    # Sessions in input order. The rows of a session must be contiguous, as
+    # export.export_csv writes them, so that a single session is held at a
+    # time.
+    session = None
+    done = set()
+    for line, sessions, players, judgements, jury, values in read(file):
+        votes = _votes(values, line)
+        start = 0
+        for key, length in _runs(sessions):
+            stop = start + length
+            key = str(key)
+            if session is None or session.key != key:
+                if session is not None:
+                    done.add(session.key)
+                    yield session
+                if key in done:
+                    raise ValueError(
+                        f"line {line + start}: session {key!r} is split in "
+                        f"the input, sort the rows by session"
+                    )
+                session = Session(source, key)
+            session.add(players[start:stop], judgements[start:stop],
+                        jury[start:stop], votes[start:stop])
+            start = stop
+    if session is not None:
+        yield session
+
+
+def score_session(source, key, players, jury, judgements, records,
+                  aggregation):
+    # the results of a session, run by the workers
+    votes = VoteLog(records).array()
+    game = Game.restore(players, jury, judgements)
+    game.aggregation = aggregation
+    game.judge_many(votes["player"], votes["judgement"], votes["score"],
+                    votes["jury"])
+    scores = game.scores
+    return {
+        "source": source,
+        "session": key,
+        "aggregation": aggregation,
+        "votes": len(votes),
+        "complete": bool(game.board.voted.all()),
+        "ranking": [
+            {"rank": rank, "player": player, "score": score,
+             "judgements": scores[player]}
+            for rank, player, score in standings(game.finish_game())
+        ],
+        "judgements": {
+            judgement: [
+                {"rank": rank, "player": player, "score": score}
+                for rank, player, score in board
+            ] for judgement, board in leaderboards(scores).items()
+        },
+    }
+
+
+def _score(job):
+    return score_session(*job)
+
+
+def score(sessions, aggregation="mean", processes=None):
+    # Results in session order. Sessions are scored by a pool of processes
+    # while the next ones are read, at most two per process are in flight.
+    jobs = (session.job(aggregation) for session in sessions)
+    if processes == 1:
+        yield from map(_score, jobs)
+        return
+    window = 2 * (processes or os.cpu_count() or 1)
+    with Pool(processes) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.apply_async(_score, (job,)))
+            if len(pending) >= window:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def write_jsonl(output, results):
+    for result in results:
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def write_csv(output, results):
+    # one row per standing, the overall ranking has an empty judgement
+    writer = csv.writer(output)
+    writer.writerow(["source", "session", "judgement", "rank", "player",
+                     "score"])
+    for result in results:
+        prefix = (result["source"], result["session"])
+        writer.writerows(
+            prefix + ("", s["rank"], s["player"], s["score"])
+            for s in result["ranking"]
+        )
+        for judgement, board in result["judgements"].items():
+            writer.writerows(
+                prefix + (judgement, s["rank"], s["player"], s["score"])
+                for s in board
+            )
+
+
+def _open(path):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8",
+                                newline="")
+    return open(path, newline="", encoding="utf-8")
+
+
+def _read_all(paths):
+    for path in paths:
+        with _open(path) as file:
+            yield from read_sessions(file, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score games from vote files: CSV with player, "
+                    "judgement, jury, vote and an optional session column, "
+                    "or JSON lines with the same keys."
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="vote files, - or nothing for stdin")
+    parser.add_argument("--output", default="-",
+                        help="results file, stdout by default")
+    parser.add_argument("--format", choices=["jsonl", "csv"],
+                        default="jsonl", help="results format")
+    parser.add_argument("--aggregation", default="mean",
+                        help="name[:parameter], see aggregators.strategies")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="scoring processes, 1 scores in this process")
+    args = parser.parse_args(argv)
+
+    from aggregators import make_aggregator
+    try:
+        make_aggregator(args.aggregation)
+    except ValueError as error:
+        parser.error(str(error))
+    write = write_csv if args.format == "csv" else write_jsonl
+    output = sys.stdout if args.output == "-" else \
+        open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        write(output, score(
+            _read_all(args.inputs), args.aggregation, args.processes
+        ))
+    except ValueError as error:
+        sys.exit(f"error: {error}")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+
+from profiling import tracer
+
+# main.py imports this module first, start-up is timed from here
+STARTED = time.perf_counter()
+
+# Debug switches, read before main.py imports the game and defines its
+# screens, as traced handlers are wrapped when they are defined.
+#
+# On a desktop they come from the environment: BIAS_PROFILE=1 logs the
+# start-up times, BIAS_TRACE=1 traces the hot paths and F12 shows them. On a
+# phone, where the environment cannot be set, "Mode débogage" in the
+# settings turns both on in debug.json, in the app's data directory, from
+# the next launch; a triple tap in the top left corner shows the overlay and
+# its button exports the trace next to debug.json.
+DEBUG_FILE = "debug.json"
+SWITCHES = {"profile": "BIAS_PROFILE", "trace": "BIAS_TRACE"}
+# BiasApp.name, which names its data directory
+APP_NAME = "bias"
+
+
+class _AppName:
+    name = APP_NAME
+
+
+def data_dir():
+    # BiasApp.user_data_dir, before the app is created
+    from kivy.app import App
+    return App._get_user_data_dir(_AppName())
+
+
+def read_switches(directory=None, environment=True):
+    switches = dict.fromkeys(SWITCHES, False)
+    try:
+        path = os.path.join(directory or data_dir(), DEBUG_FILE)
+        with open(path) as file:
+            saved = json.load(file)
+        for switch in switches:
+            switches[switch] = bool(saved.get(switch))
+    except (OSError, ValueError, AttributeError):
+        # no data directory, no file or a damaged one leaves debugging off
+        pass
+    if environment:
+        for switch, variable in SWITCHES.items():
+            if os.environ.get(variable):
+                switches[switch] = True
+    return switches
+
+
+def write_switches(switches, directory=None):
+    path = os.path.join(directory or data_dir(), DEBUG_FILE)
+    with open(path, "w") as file:
+        json.dump(switches, file)
+
+
+switches = read_switches()
+tracer.enabled = switches["trace"]
@@ -0,0 +1,180 @@
+import json
+import os
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from heapq import nlargest
+from typing import Dict, Iterable, List
+
+PLAYERS = "players"
+JUDGEMENTS = "judgements"
+
+SUGGESTIONS = 6
+# recent rosters kept as presets
+PRESETS = 4
+# sorts after any folded prefix
+_LAST = "\U0010ffff"
+
+# A roster played before: players in their order and the ones who were in
+# the jury.
+Preset = namedtuple("Preset", ["players", "jury", "used_at"])
+
+
+def fold(text: str) -> str:
+    # lookup key: no case and no accents, "théo" and "THEO" are alike
+    return "".join(
+        c for c in unicodedata.normalize("NFD", text.casefold())
+        if not unicodedata.combining(c)
+    )
+
+
+class PrefixIndex:
+    # Names sorted by the folded key of each of their words, so that the
+    # names with a word starting with a prefix are a contiguous slice found
+    # by two bisections: "dup" finds "Jean Dupont". Each name keeps how many
+    # games it was in and when last, suggestions are the most used first.
+    def __init__(self):
+        self._entries = list()  # sorted (folded word, name)
+        self.uses = dict()  # name -> [games, last used]
+
+    def __contains__(self, name):
+        return name in self.uses
+
+    def __len__(self):
+        return len(self.uses)
+
+    def __iter__(self):
+        return iter(self.uses)
+
+    def load(self, uses: Dict[str, List]):
+        # many names at once, sorted a single time
+        entries = self._entries
+        for name, (count, used_at) in uses.items():
+            if name in self.uses:
+                continue
+            self.uses[name] = [count, used_at]
+            entries.extend(
+                (word, name) for word in dict.fromkeys(fold(name).split())
+            )
+        entries.sort()
+
+    def use(self, names: Iterable[str], when=None):
+        # one more game for each name, the new ones are sorted in at once
+        when = time.time() if when is None else when
+        new = dict()
+        for name in names:
+            uses = self.uses.get(name)
+            if uses is None:
+                new[name] = [1, when]
+            else:
+                uses[0] += 1
+                uses[1] = when
+        if new:
+            self.load(new)
+
+    def search(self, prefix: str, limit=SUGGESTIONS, exclude=()) -> List[str]:
+        # the most used names with a word starting with prefix, every name
+        # for an empty prefix
+        key = fold(prefix).strip()
+        if key:
+            # a multi word prefix is matched on its first word, then on the
+            # whole folded name
+            first = key.split()[0]
+            start = bisect_left(self._entries, (first,))
+            stop = bisect_left(self._entries, (first + _LAST,), start)
+            found = dict.fromkeys(
+                name for _, name in self._entries[start:stop]
+            )
+            if " " in key:
+                found = [name for name in found if key in fold(name)]
+        else:
+            found = self.uses
+        uses = self.uses
+        return nlargest(
+            limit, (name for name in found if name not in exclude),
+            key=lambda name: uses[name]
+        )
+
+
+class Catalog:
+    # Players and judgements of past games, for as-you-type suggestions,
+    # and the latest rosters as presets. Kept in a JSON file, written
+    # whole and replaced at once.
+    def __init__(self, path=None):
+        self.path = path
+        self.indexes = {PLAYERS: PrefixIndex(), JUDGEMENTS: PrefixIndex()}
+        self.presets = list()  # type: List[Preset]
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as file:
+                saved = json.load(file)
+            for kind, index in self.indexes.items():
+                index.load(saved.get(kind, dict()))
+            self.presets = [
+                Preset(list(p["players"]), list(p["jury"]), p["used_at"])
+                for p in saved.get("presets", ())
+            ][:PRESETS]
+        except (OSError, ValueError, KeyError, TypeError):
+            # suggestions are a convenience, a damaged file starts over
+            self.indexes = {PLAYERS: PrefixIndex(), JUDGEMENTS: PrefixIndex()}
+            self.presets = list()
+
+    def suggest(self, kind: str, prefix: str, limit=SUGGESTIONS,
+                exclude=()) -> List[str]:
+        return self.indexes[kind].search(prefix, limit, exclude)
+
+    def remember(self, kind: str, names: Iterable[str], when=None):
+        self.indexes[kind].use(names, when)
+
+    def record_game(self, players, jury, judgements, when=None):
+        # at the start of a game: its names are used once more and its
+        # roster becomes the latest preset
+        when = time.time() if when is None else when
+        players = list(players)
+        same = set(players)
+        jury = [j for j in jury if j in same]
+        self.remember(PLAYERS, players, when)
+        self.remember(JUDGEMENTS, judgements, when)
+        self.presets = [Preset(players, jury, when)] + [
+            p for p in self.presets if set(p.players) != same
+        ][:PRESETS - 1]
+
+    def dumps(self) -> str:
+        return json.dumps({
+            PLAYERS: self.indexes[PLAYERS].uses,
+            JUDGEMENTS: self.indexes[JUDGEMENTS].uses,
+            "presets": [p._asdict() for p in self.presets],
+        }, ensure_ascii=False)
+
+    def save(self):
+        if not self.path:
+            return
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.dumps())
+        os.replace(temporary, self.path)
+
+
+if __name__ == '__main__':
+    import random
+
+    rng = random.Random(0)
+    syllables = ["ma", "lo", "ri", "an", "té", "jul", "co", "sa", "el", "no"]
+    catalog = Catalog()
+    names = {
+        " ".join("".join(rng.choices(syllables, k=rng.randint(2, 3))).title()
+                 for _ in range(2))
+        for _ in range(5000)
+    }
+    catalog.remember(PLAYERS, names)
+    for prefix in ("", "m", "ma", "malo", "xyz"):
+        start = time.perf_counter()
+        for _ in range(100):
+            found = catalog.suggest(PLAYERS, prefix)
+        elapsed = (time.perf_counter() - start) / 100
+        print(f"{len(names)} names, {prefix!r}: {elapsed * 1e3:.3f} ms, "
+              f"{found[:3]}")
@@ -1,5 +1,17 @@
+from kivy.utils import platform
+
 GAME = "Game"
+JOIN = "Join"
 SETTINGS = "Settings"
 EXIT = "Exit"
 JUDGEMENTS = "Judgements"
+DEBUG = "Debug"
 BACK = "Back"
+
+SMALL_HEIGHT = 75 if platform == 'android' else 40
+MEDIUM_HEIGHT = 150 if platform == 'android' else 60
+LARGE_HEIGHT = 250 if platform == 'android' else 80
+
+SMALL_WIDTH = 250 if platform == 'android' else 100
+MEDIUM_WIDTH = 500 if platform == 'android' else 200
+LARGE_WIDTH = 750 if platform == 'android' else 300
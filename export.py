@@ -0,0 +1,167 @@
+import csv
+import struct
+import zipfile
+from collections import namedtuple
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from game import Game
+from scoring import NO_VOTE
+
+# bytes of votes written at once
+CHUNK = 1 << 20
+# the local file header of a zip member, before its name and extra field
+LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+# A game to export. Names come first, votes are loaded only when written,
+# so that exporting many stored sessions holds one tensor at a time.
+Session = namedtuple("Session", [
+    "played_at", "aggregation", "players", "jury", "judgements", "load_votes"
+])
+
+
+def game_session(game: Game, played_at=0.) -> Session:
+    board = game.board
+    return Session(
+        played_at, game.aggregation, list(board.player_ids),
+        list(board.jury_ids), list(board.judgement_ids), lambda: board.votes
+    )
+
+
+def _shape(session: Session):
+    return len(session.players), len(session.judgements), len(session.jury)
+
+
+def _write_array(archive, name, array):
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+        np.lib.format.write_array(member, np.asarray(array),
+                                  allow_pickle=False)
+
+
+def _names(archive, name, tables):
+    offsets = np.zeros(len(tables) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(names) for names in tables])
+    _write_array(archive, name, np.array(
+        [n for names in tables for n in names], dtype=str
+    ))
+    _write_array(archive, f"{name}_offsets", offsets)
+
+
+def export_npz(path, sessions: Sequence[Session]):
+    # Columnar archive: the votes of every session flattened into a single
+    # int8 column, cut by `offsets` and reshaped by `shapes`, and a name
+    # table per roster. Members are stored uncompressed so that Archive can
+    # memory-map the votes.
+    shapes = np.array([_shape(s) for s in sessions],
+                      dtype=np.int64).reshape(-1, 3)
+    offsets = np.zeros(len(sessions) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(shapes.prod(axis=1))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED,
+                         allowZip64=True) as archive:
+        with archive.open("votes.npy", "w", force_zip64=True) as member:
+            np.lib.format.write_array_header_2_0(member, {
+                "descr": np.lib.format.dtype_to_descr(np.dtype(np.int8)),
+                "fortran_order": False,
+                "shape": (int(offsets[-1]),),
+            })
+            for session, shape in zip(sessions, shapes):
+                votes = np.ascontiguousarray(session.load_votes(),
+                                             dtype=np.int8)
+                if votes.shape != tuple(shape):
+                    raise ValueError("the votes do not match the rosters")
+                data = memoryview(votes).cast("B")
+                for start in range(0, len(data), CHUNK):
+                    member.write(data[start:start + CHUNK])
+        _write_array(archive, "offsets", offsets)
+        _write_array(archive, "shapes", shapes)
+        _write_array(archive, "played_at", np.array(
+            [s.played_at for s in sessions], dtype=np.float64
+        ))
+        _write_array(archive, "aggregation", np.array(
+            [s.aggregation for s in sessions], dtype=str
+        ))
+        for name in ("players", "jury", "judgements"):
+            _names(archive, name, [getattr(s, name) for s in sessions])
+    return path
+
+
+def export_csv(output, sessions: Iterable[Session]):
+    # one row per vote, written a session at a time, to a path or an open
+    # text file
+    if isinstance(output, str):
+        with open(output, "w", newline="", encoding="utf-8") as file:
+            return export_csv(file, sessions)
+    writer = csv.writer(output)
+    writer.writerow(["session", "played_at", "player", "judgement", "jury",
+                     "vote"])
+    for index, session in enumerate(sessions):
+        votes = session.load_votes()
+        players, judgements, jury = np.nonzero(votes != NO_VOTE)
+        writer.writerows(zip(
+            [index] * len(players), [session.played_at] * len(players),
+            [session.players[i] for i in players.tolist()],
+            [session.judgements[i] for i in judgements.tolist()],
+            [session.jury[i] for i in jury.tolist()],
+            votes[players, judgements, jury].tolist(),
+        ))
+    return output
+
+
+def _mmap_member(path, name):
+    # a stored .npy member of a zip file, mapped in place
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{name} is compressed and cannot be mapped")
+    with open(path, "rb") as file:
+        file.seek(info.header_offset)
+        header = LOCAL_HEADER.unpack(file.read(LOCAL_HEADER.size))
+        name_length, extra_length = header[-2:]
+        file.seek(name_length + extra_length, 1)
+        if np.lib.format.read_magic(file) == (1, 0):
+            header = np.lib.format.read_array_header_1_0(file)
+        else:
+            header = np.lib.format.read_array_header_2_0(file)
+        shape, fortran_order, dtype = header
+        offset = file.tell()
+    if not shape or not np.prod(shape):
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset,
+                     shape=shape, order="F" if fortran_order else "C")
+
+
+class Archive:
+    # An exported file. The vote column is memory-mapped, a session's
+    # tensor is a view into it until it is copied into a Game.
+    def __init__(self, path):
+        self.path = path
+        with np.load(path, allow_pickle=False) as columns:
+            self.offsets = columns["offsets"]
+            self.shapes = columns["shapes"]
+            self.played_at = columns["played_at"]
+            self.aggregation = columns["aggregation"].tolist()
+            self._names = {
+                name: (columns[name].tolist(), columns[f"{name}_offsets"])
+                for name in ("players", "jury", "judgements")
+            }
+        self.votes = _mmap_member(path, "votes.npy")
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def tensor(self, index):
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.votes[start:stop].reshape(self.shapes[index])
+
+    def names(self, name, index):
+        names, offsets = self._names[name]
+        return names[offsets[index]:offsets[index + 1]]
+
+    def game(self, index) -> Game:
+        game = Game.restore(
+            self.names("players", index), self.names("jury", index),
+            self.names("judgements", index), votes=self.tensor(index)
+        )
+        game.aggregation = self.aggregation[index]
+        return game
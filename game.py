@@ -1,23 +1,120 @@
 import random
-from typing import Dict
+from typing import Dict, Optional, TYPE_CHECKING, Union
+
+from profiling import tracer
+from roster import NameTable, Roster
+from sequencer import TurnPlan
+from votes import Event, EventLog
+
+if TYPE_CHECKING:
+    from aggregators import Aggregator
+    from analytics import BiasTracker
+    from scoring import ScoreBoard
+
+# numpy backed modules are imported when a game starts, not at start-up
+
+
+def _id(ids, key) -> int:
+    # a roster name, or already its id
+    if isinstance(key, str):
+        return ids[key]
+    key = int(key)
+    if not 0 <= key < len(ids):
+        raise KeyError(key)
+    return key
+
+
+def _ids(ids, keys):
+    # roster names or ids, as ids, integer arrays are checked at once
+    if getattr(keys, "dtype", None) is not None and keys.dtype.kind in "iu":
+        if len(keys) and not (0 <= keys.min() and keys.max() < len(ids)):
+            raise KeyError("id out of the roster")
+        return keys
+    return [_id(ids, key) for key in keys]
 
 
 class Game:
-    def __init__(self, players=None, jury=None, judgements=None):
+    def __init__(self, players=None, jury=None, judgements=None,
+                 aggregation="mean", seed=None, rng=None):
         self.is_set = False
-        self._players = players if players is not None else list()
-        self._jury = jury if jury is not None else list()
-        self._judgements = judgements if judgements is not None else list()
-        self._scores = dict()
+        # the names of the game, interned once for its three rosters
+        self.names = NameTable()
+        self._players = Roster(players or (), self.names)
+        self._jury = Roster(jury or (), self.names)
+        self._judgements = Roster(judgements or (), self.names)
+        self._board = None  # type: Optional[ScoreBoard]
+        self._bias = None  # type: Optional[BiasTracker]
+        self._aggregation = aggregation
+        self._aggregator = None  # type: Optional[Aggregator]
         self._descriptions = dict()  # type: Dict[str: str]
+        self.journal = None
+        # written to the history, a game recovered once over is not saved
+        # a second time
+        self.saved = False
+        # every draw of the game comes from here: the same seed plays the
+        # same game, a numpy Generator works too
+        self.rng = random.Random(seed) if rng is None else rng
+        self._plan = None  # type: Optional[TurnPlan]
+        self._turn = 0
+        # the votes cast on this game, as ids, in order, with what each
+        # replaced so that they can be undone
+        self.log = EventLog()
 
     def set(self):
-        random.shuffle(self._players)
-        random.shuffle(self._judgements)
-        self._scores = {
-            p: {j: 0 for j in self.judgements} for p in self.players
-        }  # type: Dict[Dict[str: int]]
+        self._players.shuffle(self.rng)
+        self._judgements.shuffle(self.rng)
+        # ids are dense and shared with the ScoreBoard for the whole game
+        for roster in (self._players, self._jury, self._judgements):
+            roster.compact()
+        from scoring import ScoreBoard
+        self._board = ScoreBoard(self.players, self.judgements, self.jury)
+        self._bias = None
+        self._aggregator = None
+        self._turn = 0
+        self.log.reset(self._board.votes)
+        self._plan = TurnPlan(self.rng, *self._board.shape)
         self.is_set = True
+        self.saved = False
+        if self.journal is not None:
+            self.journal.record_setup(self)
+
+    @classmethod
+    def restore(cls, players, jury, judgements, votes=None, order=None):
+        # rebuild a started game without reshuffling, ids follow the given
+        # players, jury and judgements order
+        from scoring import ScoreBoard
+        game = cls(list(players), list(jury), list(judgements))
+        game._board = ScoreBoard(players, judgements, jury)
+        if votes is not None:
+            game._board.load(votes)
+        game.log.reset(game._board.votes)
+        if order is not None:
+            game._players.reorder(order)
+        game.is_set = True
+        return game
+
+    @classmethod
+    def from_export(cls, path, index=0):
+        # a game of a file written by export.export_npz
+        from export import Archive
+        return Archive(path).game(index)
+
+    def reset(self):
+        self._board = None
+        self._bias = None
+        self._aggregator = None
+        self._plan = None
+        self._turn = 0
+        self.log.reset()
+        self.is_set = False
+        self.saved = False
+        if self.journal is not None:
+            self.journal.record_end()
+
+    def mark_saved(self):
+        self.saved = True
+        if self.journal is not None:
+            self.journal.record_saved()
 
     @property
     def players(self):
@@ -32,10 +129,10 @@ class Game:
         return self._jury
 
     @jury.setter
-    def jury(self, *value):
-        self._jury = list()
-        for jury in value:
-            self._jury.append(jury)
+    def jury(self, value):
+        if self.is_set:
+            raise RuntimeError
+        self._jury = Roster(value, self.names)
 
     @property
     def jury_number(self):
@@ -49,20 +146,91 @@ class Game:
     def judgment_number(self):
         return len(self._judgements)
 
+    @property
+    def plan(self):
+        # drawn by set(), or on first use for a restored game, from the
+        # first judgement its votes did not complete
+        if self._plan is None and self._board is not None:
+            board = self._board
+            complete = (board.count == board.shape[2]).all(axis=0).tolist()
+            self._turn = complete.index(False) if False in complete \
+                else len(complete)
+            self._plan = TurnPlan(
+                self.rng, *board.shape, start=self._turn,
+                first=[self._players.id(p) for p in self._players]
+            )
+        return self._plan
+
+    @property
+    def turn(self):
+        # the index, and id, of the judgement being played, a restored game
+        # finds it when its plan is drawn
+        return self._turn if self.plan is not None else 0
+
+    @property
+    def board(self):
+        return self._board
+
+    @property
+    def bias(self):
+        # built from the votes on first access, then kept up to date on
+        # every judge()
+        if self._bias is None and self._board is not None:
+            from analytics import BiasTracker
+            self._bias = BiasTracker(self._board, [
+                self._board.player_ids.get(j, -1) for j in self._board.jury_ids
+            ])
+            self._board.listeners.append(self._bias)
+        return self._bias
+
+    @property
+    def aggregation(self):
+        return self._aggregation
+
+    @aggregation.setter
+    def aggregation(self, spec):
+        # "name[:parameter]", see aggregators.strategies; switching during
+        # or after a game rebuilds the new strategy from the board
+        from aggregators import make_aggregator
+        aggregator = make_aggregator(spec)
+        if self._aggregator is not None:
+            self._aggregator.detach()
+            self._aggregator = None
+        self._aggregation = spec
+        if self._board is not None:
+            aggregator.attach(self._board)
+            self._aggregator = aggregator
+
+    @property
+    def aggregator(self):
+        if self._aggregator is None and self._board is not None:
+            from aggregators import make_aggregator
+            self._aggregator = make_aggregator(self._aggregation)
+            self._aggregator.attach(self._board)
+        return self._aggregator
+
     @property
     def scores(self):
-        return self._scores
+        if self._board is None:
+            return dict()
+        means = self.aggregator.cells().tolist()
+        board = self._board
+        return {
+            p: {
+                j: means[board.player_ids[p]][board.judgement_ids[j]]
+                for j in self.judgements
+            } for p in self.players
+        }  # type: Dict[str: Dict[str: float]]
 
     def add_player(self, player):
         if not self.is_set:
-            self._players.append(player)
+            self._players.add(player)
         else:
             raise RuntimeError
 
     def remove_player(self, player):
         if not self.is_set:
-            if player in self.players:
-                self._players.remove(player)
+            self._players.discard(player)
         else:
             raise RuntimeError
 
@@ -72,14 +240,13 @@ class Game:
 
     def add_jury(self, jury):
         if not self.is_set:
-            self._jury.append(jury)
+            self._jury.add(jury)
         else:
             raise RuntimeError
 
     def remove_jury(self, jury):
         if not self.is_set:
-            if jury in self.jury:
-                self._jury.remove(jury)
+            self._jury.discard(jury)
         else:
             raise RuntimeError
 
@@ -89,14 +256,13 @@ class Game:
 
     def add_judgement(self, judgement):
         if not self.is_set:
-            self._judgements.append(judgement)
+            self._judgements.add(judgement)
         else:
             raise RuntimeError
 
     def remove_judgement(self, judgement):
         if not self.is_set:
-            if judgement in self.judgements:
-                self._judgements.remove(judgement)
+            self._judgements.discard(judgement)
         else:
             raise RuntimeError
 
@@ -104,25 +270,125 @@ class Game:
         for judgement in judgements:
             self.add_judgement(judgement)
 
-    def judge(self, player: str, judgement: str, vote: int):
+    @tracer.traced("Game.judge")
+    def judge(self, player: Union[str, int], judgement: Union[str, int],
+              vote: int, jury: Union[str, int, None] = None):
+        # players, judgements and jurors by name or by id
         if not 0 <= vote <= 10:
             raise ValueError
-        self._scores[player][judgement] += vote
+        board = self._board
+        p = board.player_ids.get(player)
+        if p is None:
+            p = _id(board.player_ids, player)
+        j = board.judgement_ids.get(judgement)
+        if j is None:
+            j = _id(board.judgement_ids, judgement)
+        if jury is None:
+            jr = board.free_jury(p, j)
+        else:
+            jr = board.jury_ids.get(jury)
+            if jr is None:
+                jr = _id(board.jury_ids, jury)
+        previous = board.judge(p, j, jr, vote)
+        self.log.record(p, j, jr, vote, previous)
+        if self.journal is not None:
+            self.journal.record_vote(self, p, j, jr, vote)
+
+    def judge_many(self, players, judgements, votes, jury):
+        if not len(votes):
+            # an empty chunk of the journal or of the network
+            return
+        board = self._board
+        players = _ids(board.player_ids, players)
+        judgements = _ids(board.judgement_ids, judgements)
+        jury = _ids(board.jury_ids, jury)
+        previous = board.judge_many(players, judgements, jury, votes)
+        self.log.extend(players, judgements, jury, votes, previous)
+        if self.journal is not None:
+            self.journal.record_votes(self, players, judgements, jury, votes)
+
+    def amend(self, player: Union[str, int], judgement: Union[str, int],
+              jury: Union[str, int], vote: int):
+        # changes a vote already cast, an undo brings the first one back
+        board = self._board
+        if not board.has_vote(_id(board.player_ids, player),
+                              _id(board.judgement_ids, judgement),
+                              _id(board.jury_ids, jury)):
+            raise ValueError("no vote to amend")
+        self.judge(player, judgement, vote, jury)
+
+    def undo(self) -> Optional[Event]:
+        # Takes back the last event still applied by applying its reverse
+        # delta to the board, the scores follow vote by vote. Returns the
+        # event, None when there is nothing to undo.
+        event = self.log.undo()
+        if event is not None:
+            self._board.judge(event.player, event.judgement, event.jury,
+                              event.previous)
+            if self.journal is not None:
+                self.journal.record_undo(self)
+        return event
+
+    def redo(self) -> Optional[Event]:
+        # applies again the last event undone, until a new vote is cast
+        event = self.log.redo()
+        if event is not None:
+            self._board.judge(event.player, event.judgement, event.jury,
+                              event.vote)
+            if self.journal is not None:
+                self.journal.record_redo(self)
+        return event
 
     def summarize_turn(self, player, judgement):
-        self._scores[player][judgement] /= len(self._jury)
-        return self.scores.get(player).get(judgement)
+        board = self._board
+        return self.aggregator.cell(
+            board.player_ids[player], board.judgement_ids[judgement]
+        )
+
+    def turn_variance(self, player, judgement):
+        board = self._board
+        return board.cell_variance(
+            board.player_ids[player], board.judgement_ids[judgement]
+        )
+
+    def turn_complete(self, player, judgement):
+        board = self._board
+        return board.all_voted(
+            board.player_ids[player], board.judgement_ids[judgement]
+        )
+
+    def judgement_complete(self, judgement):
+        board = self._board
+        count = board.count[:, board.judgement_ids[judgement]]
+        return bool((count == board.shape[2]).all())
+
+    def has_voted(self, player, judgement, jury):
+        board = self._board
+        return board.has_vote(
+            board.player_ids[player], board.judgement_ids[judgement],
+            board.jury_ids[jury]
+        )
 
     def finish_turn(self):
-        random.shuffle(self._players)
+        plan = self.plan
+        self._turn += 1
+        if self._turn < plan.judgement_number:
+            self._players.reorder(
+                [self._players.name(i) for i in plan.order(self._turn)]
+            )
+        if self.journal is not None:
+            self.journal.record_turn(self)
 
     def finish_game(self):
-        final_scores = {p: 0 for p in self.players}
-        for player in self.players:
-            for judgment in self.judgements:
-                final_scores[player] += self.scores.get(player).get(judgment)
-            final_scores[player] /= len(self._judgements)
-        return final_scores
+        finals = self.aggregator.finals().tolist()
+        ids = self._board.player_ids
+        return {p: finals[ids[p]] for p in self.players}
+
+    def ranking(self):
+        finals = self.aggregator.finals()
+        players = list(self._board.player_ids)
+        return [(players[i], float(finals[i]))
+                for i in (-finals).argsort(kind="stable")]
 
     @property
     def can_start(self):
@@ -131,6 +397,12 @@ class Game:
 
 
 if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 or not sys.stdin.isatty():
+        # vote files or piped votes, see batch.py
+        from batch import main
+        sys.exit(main())
     game = Game(
         players=["Louis", "Theo", "Jules"],
         jury=["Louis", "Theo", "Jules"],
@@ -141,7 +413,7 @@ if __name__ == '__main__':
         for _pl in game.players:
             for _jr in game.jury:
                 score = input(f"Vote {_ju} for {_pl} from {_jr}: ")
-                game.judge(_pl, _ju, int(score))
+                game.judge(_pl, _ju, int(score), _jr)
             print(
                 f"Score for {_pl} for {_ju}: "
                 f"{game.summarize_turn(_pl, _ju):.2f}"
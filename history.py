@@ -0,0 +1,290 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from game import Game
+from ranking import standings
+
+if TYPE_CHECKING:
+    from export import Session
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    aggregation TEXT NOT NULL,
+    players INTEGER NOT NULL,
+    jury INTEGER NOT NULL,
+    judgements INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_played_at ON sessions (played_at);
+-- the raw (players, judgements, jury) int8 tensor, apart so that queries on
+-- the other tables never page it in
+CREATE TABLE IF NOT EXISTS session_votes (
+    session INTEGER PRIMARY KEY REFERENCES sessions (id) ON DELETE CASCADE,
+    votes BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_players (
+    session INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    final REAL NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (session, position)
+);
+CREATE INDEX IF NOT EXISTS session_players_player
+    ON session_players (player, session);
+CREATE TABLE IF NOT EXISTS session_jury (
+    session INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    jury TEXT NOT NULL,
+    leniency REAL,
+    PRIMARY KEY (session, position)
+);
+CREATE INDEX IF NOT EXISTS session_jury_jury ON session_jury (jury, session);
+CREATE TABLE IF NOT EXISTS session_judgements (
+    session INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    judgement TEXT NOT NULL,
+    PRIMARY KEY (session, position)
+);
+-- one row per (player, judgement) cell, clustered for per player trends
+CREATE TABLE IF NOT EXISTS cell_scores (
+    player TEXT NOT NULL,
+    judgement TEXT NOT NULL,
+    session INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    score REAL NOT NULL,
+    variance REAL NOT NULL,
+    votes INTEGER NOT NULL,
+    PRIMARY KEY (player, judgement, session)
+) WITHOUT ROWID;
+"""
+
+
+logger = logging.getLogger(__name__)
+
+
+def _connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    return connection
+
+
+def session_record(game: Game, played_at=None):
+    # everything saved of a finished game, copied so that the game can be
+    # reset while the record is written
+    board = game.board
+    players = list(board.player_ids)
+    finals = game.finish_game()
+    ranks = {s.player: s.rank for s in standings(finals)}
+    leniency = game.bias.leniency().tolist()
+    return {
+        "played_at": time.time() if played_at is None else played_at,
+        "aggregation": game.aggregation,
+        "players": players,
+        "jury": list(board.jury_ids),
+        "judgements": list(board.judgement_ids),
+        "votes": board.votes.tobytes(),
+        "finals": [finals[p] for p in players],
+        "ranks": [ranks[p] for p in players],
+        "leniency": leniency,
+        "scores": game.aggregator.cells().tolist(),
+        "variances": board.cell_variances().tolist(),
+        "counts": board.count.tolist(),
+    }
+
+
+class HistoryStore:
+    # Finished games in a SQLite database. Games are written by a
+    # background thread, a transaction per game, queries run on the calling
+    # thread over their own connection.
+    def __init__(self, path):
+        self.path = path
+        connection = _connect(path)
+        connection.executescript(SCHEMA)
+        connection.close()
+        self._reader = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def save(self, game: Game):
+        # only the votes and names are copied here, the scores are computed
+        # by the writer from a restored game
+        board = game.board
+        self._queue.put((
+            list(board.player_ids), list(board.jury_ids),
+            list(board.judgement_ids), board.votes.copy(), game.aggregation,
+            time.time(),
+        ))
+
+    def _write(self):
+        connection = _connect(self.path)
+        while True:
+            saved = self._queue.get()
+            try:
+                if saved is None:
+                    break
+                *names, votes, aggregation, played_at = saved
+                game = Game.restore(*names, votes=votes)
+                game.aggregation = aggregation
+                with connection:
+                    self._insert(connection, session_record(game, played_at))
+            except Exception:
+                # the history is best effort, a failed game is skipped
+                logger.exception("could not save a session")
+            finally:
+                self._queue.task_done()
+        connection.close()
+
+    @staticmethod
+    def _insert(connection, record):
+        players, jury, judgements = (
+            record["players"], record["jury"], record["judgements"]
+        )
+        session = connection.execute(
+            "INSERT INTO sessions (played_at, aggregation, players, jury,"
+            " judgements) VALUES (?, ?, ?, ?, ?)",
+            (record["played_at"], record["aggregation"], len(players),
+             len(jury), len(judgements))
+        ).lastrowid
+        connection.execute(
+            "INSERT INTO session_votes (session, votes) VALUES (?, ?)",
+            (session, record["votes"])
+        )
+        connection.executemany(
+            "INSERT INTO session_players VALUES (?, ?, ?, ?, ?)",
+            [(session, i, player, final, rank) for i, (player, final, rank)
+             in enumerate(zip(players, record["finals"], record["ranks"]))]
+        )
+        connection.executemany(
+            "INSERT INTO session_jury VALUES (?, ?, ?, ?)",
+            [(session, i, juror, leniency) for i, (juror, leniency)
+             in enumerate(zip(jury, record["leniency"]))]
+        )
+        connection.executemany(
+            "INSERT INTO session_judgements VALUES (?, ?, ?)",
+            [(session, i, judgement) for i, judgement in enumerate(judgements)]
+        )
+        connection.executemany(
+            "INSERT INTO cell_scores VALUES (?, ?, ?, ?, ?, ?)",
+            [(player, judgement, session, record["scores"][p][j],
+              record["variances"][p][j], record["counts"][p][j])
+             for p, player in enumerate(players)
+             for j, judgement in enumerate(judgements)]
+        )
+
+    def flush(self):
+        # waits for the games saved so far to be written
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = _connect(self.path)
+        return self._reader
+
+    def sessions(self, limit=50) -> List[Tuple[int, float, int]]:
+        # (session, played at, players), the latest first
+        return self.reader.execute(
+            "SELECT id, played_at, players FROM sessions"
+            " ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def trend(self, player, judgement,
+              limit=50) -> List[Tuple[int, float, float]]:
+        # (session, played at, score) of a player on a judgement, the latest
+        # first
+        return self.reader.execute(
+            "SELECT c.session, s.played_at, c.score FROM cell_scores c"
+            " JOIN sessions s ON s.id = c.session"
+            " WHERE c.player = ? AND c.judgement = ?"
+            " ORDER BY c.session DESC LIMIT ?", (player, judgement, limit)
+        ).fetchall()
+
+    def finals(self, player, limit=50) -> List[Tuple[int, float, float, int]]:
+        # (session, played at, final score, rank), the latest first
+        return self.reader.execute(
+            "SELECT p.session, s.played_at, p.final, p.rank"
+            " FROM session_players p JOIN sessions s ON s.id = p.session"
+            " WHERE p.player = ? ORDER BY p.session DESC LIMIT ?",
+            (player, limit)
+        ).fetchall()
+
+    def leniency(self, jury, limit=50) -> List[Tuple[int, float, float]]:
+        # (session, played at, leniency) of a juror, the latest first
+        return self.reader.execute(
+            "SELECT j.session, s.played_at, j.leniency"
+            " FROM session_jury j JOIN sessions s ON s.id = j.session"
+            " WHERE j.jury = ? ORDER BY j.session DESC LIMIT ?",
+            (jury, limit)
+        ).fetchall()
+
+    def votes(self, session) -> Optional[np.ndarray]:
+        # the raw vote tensor of a session, loaded on its own
+        row = self.reader.execute(
+            "SELECT s.players, s.judgements, s.jury, v.votes"
+            " FROM sessions s JOIN session_votes v ON v.session = s.id"
+            " WHERE s.id = ?", (session,)
+        ).fetchone()
+        if row is None:
+            return None
+        *shape, votes = row
+        return np.frombuffer(votes, dtype=np.int8).reshape(shape)
+
+    def exported(self, sessions=None) -> List["Session"]:
+        # export.Session records of the given sessions, all by default,
+        # oldest first, their votes read only when exported
+        from export import Session
+        reader = self.reader
+        if sessions is None:
+            sessions = [i for i, in reader.execute(
+                "SELECT id FROM sessions ORDER BY id"
+            )]
+        records = list()
+        for session in sessions:
+            played_at, aggregation = reader.execute(
+                "SELECT played_at, aggregation FROM sessions WHERE id = ?",
+                (session,)
+            ).fetchone()
+            records.append(Session(
+                played_at, aggregation, *self._names(session),
+                lambda session=session: self.votes(session)
+            ))
+        return records
+
+    def _names(self, session):
+        # players, jury and judgements of a session, in id order
+        return [
+            [name for name, in self.reader.execute(
+                f"SELECT {column} FROM {table} WHERE session = ?"
+                " ORDER BY position", (session,)
+            )] for column, table in (
+                ("player", "session_players"), ("jury", "session_jury"),
+                ("judgement", "session_judgements"),
+            )
+        ]
+
+    def restore(self, session) -> Optional[Game]:
+        # the finished game of a session, with its aggregation
+        votes = self.votes(session)
+        if votes is None:
+            return None
+        game = Game.restore(*self._names(session), votes=votes)
+        game.aggregation, = self.reader.execute(
+            "SELECT aggregation FROM sessions WHERE id = ?", (session,)
+        ).fetchone()
+        return game
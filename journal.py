@@ -0,0 +1,263 @@
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from game import Game
+from votes import VOTE_RECORD, EventLog, VoteLog
+
+SETUP = 1
+VOTE = 2
+VOTES = 3
+TURN = 4
+END = 5
+UNDO = 6
+REDO = 7
+SAVED = 8
+
+HEADER = struct.Struct("<BII")  # kind, payload length, payload crc32
+SNAPSHOT_MAGIC = b"BPSNAP1\n"
+
+
+class Journal:
+    def __init__(self, path, sync_every=32, snapshot_every=512):
+        self.path = path
+        self.snapshot_path = path + ".snap"
+        self.sync_every = sync_every
+        self.snapshot_every = snapshot_every
+        self._file = open(path, "ab")
+        self._unsynced = 0
+        self._since_snapshot = 0
+
+    def _write(self, kind, payload=b""):
+        self._file.write(HEADER.pack(kind, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._unsynced += 1
+
+    def record_setup(self, game):
+        self.truncate()
+        board = game.board
+        self._write(SETUP, json.dumps({
+            "players": list(board.player_ids),
+            "jury": list(board.jury_ids),
+            "judgements": list(board.judgement_ids),
+        }).encode())
+        self.flush()
+
+    def record_vote(self, game, player, judgement, jury, vote):
+        self._write(VOTE, VOTE_RECORD.pack(player, judgement, jury, vote))
+        self._since_snapshot += 1
+        self._maybe_sync(game)
+
+    def record_votes(self, game, players, judgements, jury, votes):
+        # the votes as consecutive VOTE_RECORDs, as in a VoteLog
+        log = VoteLog()
+        log.extend(players, judgements, jury, votes)
+        self._write(VOTES, log.records)
+        self._since_snapshot += len(votes)
+        self._maybe_sync(game)
+
+    def record_undo(self, game):
+        self._write(UNDO)
+        self._since_snapshot += 1
+        self._maybe_sync(game)
+
+    def record_redo(self, game):
+        self._write(REDO)
+        self._since_snapshot += 1
+        self._maybe_sync(game)
+
+    def record_turn(self, game):
+        ids = game.board.player_ids
+        self._write(TURN, np.array(
+            [ids[p] for p in game.players], dtype="<u2"
+        ).tobytes())
+        self.flush()
+
+    def record_saved(self):
+        self._write(SAVED)
+        self.flush()
+
+    def record_end(self):
+        self._write(END)
+        self.flush()
+        self.truncate()
+
+    def _maybe_sync(self, game):
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot(game)
+        elif self._unsynced >= self.sync_every:
+            self.flush()
+
+    def flush(self, sync=True):
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def snapshot(self, game):
+        # The board and the events that can still be undone, those of the
+        # judgement being played: what is written does not grow with the
+        # length of the game.
+        self.flush()
+        board = game.board
+        log = game.log
+        first = min(log.turn_start(game.turn), log.position)
+        header = json.dumps({
+            "offset": self._file.tell(),
+            "players": list(board.player_ids),
+            "jury": list(board.jury_ids),
+            "judgements": list(board.judgement_ids),
+            "order": [board.player_ids[p] for p in game.players],
+            # the events follow the votes, undone ones included, the
+            # position counts from the first of them
+            "first": first,
+            "position": log.position - first,
+        }).encode()
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as snapshot:
+            snapshot.write(SNAPSHOT_MAGIC)
+            snapshot.write(struct.pack("<I", len(header)))
+            snapshot.write(header)
+            snapshot.write(board.votes.tobytes())
+            snapshot.write(log.tobytes(first))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, self.snapshot_path)
+        self._since_snapshot = 0
+
+    def truncate(self):
+        self._file.truncate(0)
+        self._file.seek(0)
+        if os.path.exists(self.snapshot_path):
+            os.remove(self.snapshot_path)
+        self._since_snapshot = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, "rb") as snapshot:
+            if snapshot.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None, 0
+            length, = struct.unpack("<I", snapshot.read(4))
+            header = json.loads(snapshot.read(length))
+            shape = (len(header["players"]), len(header["judgements"]),
+                     len(header["jury"]))
+            votes = np.frombuffer(
+                snapshot.read(int(np.prod(shape))), dtype=np.int8
+            ).reshape(shape)
+            events = snapshot.read()
+    except (OSError, ValueError, struct.error):
+        return None, 0
+    game = Game.restore(
+        header["players"], header["jury"], header["judgements"], votes,
+        [header["players"][i] for i in header["order"]]
+    )
+    try:
+        game.log = EventLog.frombytes(events, header.get("position", 0),
+                                      game.board.votes)
+    except ValueError:
+        return None, 0
+    return game, header["offset"]
+
+
+def _records(journal):
+    while True:
+        header = journal.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        kind, length, crc = HEADER.unpack(header)
+        payload = journal.read(length)
+        # a torn write at crash time ends the journal
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        yield kind, payload
+
+
+def recover(path) -> Optional[Game]:
+    if not os.path.exists(path):
+        return None
+    game, offset = None, 0
+    if os.path.exists(path + ".snap"):
+        game, offset = _read_snapshot(path + ".snap")
+    with open(path, "rb") as journal:
+        journal.seek(offset)
+        for kind, payload in _records(journal):
+            if kind == SETUP:
+                setup = json.loads(payload)
+                game = Game.restore(
+                    setup["players"], setup["jury"], setup["judgements"]
+                )
+            elif game is None:
+                continue
+            elif kind == VOTE:
+                player, judgement, jury, vote = VOTE_RECORD.unpack(payload)
+                game.judge(player, judgement, vote, jury)
+            elif kind == VOTES:
+                votes = VoteLog.frombytes(payload).array()
+                game.judge_many(votes["player"], votes["judgement"],
+                                votes["score"], votes["jury"])
+            elif kind == UNDO:
+                game.undo()
+            elif kind == REDO:
+                game.redo()
+            elif kind == TURN:
+                names = list(game.board.player_ids)
+                game.players.reorder([
+                    names[i] for i in np.frombuffer(payload, dtype="<u2")
+                ])
+            elif kind == SAVED:
+                game.saved = True
+            elif kind == END:
+                game = None
+    return game
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    def play(path, players, jury, judgements, snapshot_every):
+        journal = Journal(path, snapshot_every=snapshot_every)
+        game = Game(
+            players=[f"P{i}" for i in range(players)],
+            jury=[f"J{i}" for i in range(jury)],
+            judgements=[f"T{i}" for i in range(judgements)],
+        )
+        game.journal = journal
+        game.set()
+        start = time.perf_counter()
+        votes = 0
+        for judgement in list(game.judgements):
+            for player in list(game.players):
+                for juror in game.jury:
+                    game.judge(player, judgement, votes % 11, juror)
+                    votes += 1
+            game.finish_turn()
+        elapsed = time.perf_counter() - start
+        journal.close()
+        return game, votes, elapsed
+
+    directory = tempfile.mkdtemp()
+    for size in (15, 60, 120):
+        for snapshot_every in (10 ** 9, 512):
+            path = os.path.join(directory, f"{size}_{snapshot_every}.log")
+            game, votes, elapsed = play(path, size, size, 6, snapshot_every)
+            start = time.perf_counter()
+            recovered = recover(path)
+            recovery = time.perf_counter() - start
+            assert (recovered.board.votes == game.board.votes).all()
+            assert recovered.players == game.players
+            print(
+                f"{size} players, {votes} votes, "
+                f"snapshots {'on' if snapshot_every < 10 ** 9 else 'off'}: "
+                f"{elapsed / votes * 1e6:.1f} us/vote, "
+                f"recovery {recovery * 1e3:.1f} ms"
+            )
@@ -1,24 +1,36 @@
+import os
+import time
+
+# first: start-up is timed from its import, and its debug switches apply to
+# everything imported after it
+import boot
+
 from kivy.app import App
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.logger import Logger
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.screenmanager import ScreenManager, Screen
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.textinput import TextInput
-from kivy.utils import platform
 
-from architecture import settings_buttons, menu_buttons, buttons_names
+from architecture import settings_buttons, menu_buttons, buttons_names, \
+    aggregation_buttons, aggregation_names
+from catalog import Catalog, JUDGEMENTS as JUDGEMENT_NAMES, PLAYERS, \
+    PRESETS, SUGGESTIONS
 from constants import *
 from game import Game
+from profiling import StartupProfile, tracer
+from ranking import standings, top, bottom, leaderboards
+from scheduler import scheduler, SOON, IDLE
+from sequencer import TurnSequencer, PREP, VOTE, ROUND, SUMMARY
+from tasks import tasks
 
-SMALL_HEIGHT = 75 if platform == 'android' else 40
-MEDIUM_HEIGHT = 150 if platform == 'android' else 60
-LARGE_HEIGHT = 250 if platform == 'android' else 80
+startup = StartupProfile(boot.STARTED, enabled=boot.switches["profile"])
+startup.mark("imports")
 
-SMALL_WIDTH = 250 if platform == 'android' else 100
-MEDIUM_WIDTH = 500 if platform == 'android' else 200
-LARGE_WIDTH = 750 if platform == 'android' else 300
+OVERALL = "Général"
 
 
 def name_factory(order):
@@ -28,32 +40,87 @@ def name_factory(order):
     return name()
 
 
+def add_vote_buttons(layout, on_vote):
+    buttons = list()
+    for _ in iter_vote_buttons(layout, on_vote, buttons):
+        pass
+    return buttons
+
+
+def iter_vote_buttons(layout, on_vote, buttons=None):
+    # adds the buttons one by one, to be built over several frames by the
+    # scheduler
+    buttons = buttons if buttons is not None else list()
+    ten_button = Button(text="10", height=LARGE_HEIGHT, size_hint_y=None)
+    ten_button.on_press = lambda: on_vote(10)
+    layout.add_widget(ten_button)
+    buttons.append(ten_button)
+    yield
+    grid_layout = GridLayout(cols=3, size_hint_y=None)
+    grid_layout.bind(minimum_height=grid_layout.setter('height'))
+    layout.add_widget(grid_layout)
+
+    for i in range(9, 0, -1):
+        btn = Button(
+            text=str(i), size_hint_y=None, height=LARGE_HEIGHT,
+            on_press=lambda x: on_vote(int(x.text))
+        )
+        grid_layout.add_widget(btn)
+        buttons.append(btn)
+        yield
+    zero_button = Button(text="0", height=LARGE_HEIGHT, size_hint_y=None)
+    zero_button.on_press = lambda: on_vote(0)
+    layout.add_widget(zero_button)
+    buttons.append(zero_button)
+
+
 class BiasScreenManager(ScreenManager):
-    def __init__(self, **kwargs):
+    def __init__(self, journal_path=None, history_path=None, export_dir=None,
+                 catalog_path=None, **kwargs):
         super(BiasScreenManager, self).__init__(**kwargs)
-        self.game = Game(
+        self.journal_path = journal_path
+        self.history_path = history_path
+        self.export_dir = export_dir
+        self.catalog_path = catalog_path
+        self._history = None
+        self._catalog = None
+        recovered = None
+        if journal_path and os.path.exists(journal_path) and \
+                os.path.getsize(journal_path):
+            from journal import recover
+            with startup.measure("journal recovery"):
+                recovered = recover(journal_path)
+        self.game = recovered or Game(
             players=["Louis", "Théo", "Jules"],
             jury=["Louis", "Jules"],
             judgements=["Ecoute", "Bienveillance"]
         )
-        self.order_screens = list()
-        self._setup_screens()
+        self.sequencer = None
+        self.server = None
+        self.prep_screen = None
+        self.host_screen = None
+        self.voting_screen = None
+        self.summary_screen = None
+        self.end_screen = None
+        # only the menu is built up front, the other screens the first time
+        # they are opened
+        self._screen_factories = {
+            "settings": self._make_setting_screen,
+            "Judgements": self._make_judgement_settings,
+            "game_init": self._make_game_screen,
+            "join": self._make_join_screen,
+        }
+        self._screens = dict()
+        with startup.measure("screen menu"):
+            self._setup_menu()
+        if recovered is not None:
+            self.resume_game()
 
-    def _setup_screens(self):
+    def _setup_menu(self):
         self.menu_screen = _ButtonScreen(
             buttons=menu_buttons,
             name="menu"
         )
-        self.setting_screen = _ButtonScreen(
-            buttons=settings_buttons,
-            name='settings')
-        self.judgement_settings = JudgementScreen(self.game, name="Judgements")
-        self.judgement_settings.back_button.on_press = \
-            lambda: self.switch_to_settings("right")
-        self.game_screen = GameInitScreen(self.game, name="game_init")
-        self.game_screen.back_button.on_press = self.switch_to_menu
-        self.game_screen.start_button.on_press = self.init_game
-
         self.menu_screen.buttons[EXIT].on_press = exit
         self.menu_screen.buttons[EXIT].height = MEDIUM_HEIGHT
         self.menu_screen.buttons[EXIT].size_hint_y = None
@@ -61,22 +128,100 @@ class BiasScreenManager(ScreenManager):
         self.menu_screen.buttons[SETTINGS].height = LARGE_HEIGHT
         self.menu_screen.buttons[SETTINGS].size_hint_y = None
         self.menu_screen.buttons[GAME].on_press = self.switch_to_game
-        self.setting_screen.buttons[BACK].on_press = self.switch_to_menu
-        self.setting_screen.buttons[BACK].height = MEDIUM_HEIGHT
-        self.setting_screen.buttons[BACK].size_hint_y = None
-        self.setting_screen.buttons[
+        self.menu_screen.buttons[JOIN].on_press = self.switch_to_join
+        self.add_widget(self.menu_screen)
+
+    def lazy_screen(self, name):
+        screen = self._screens.get(name)
+        if screen is None:
+            with startup.measure(f"screen {name}"), \
+                    tracer.span(f"build {name}"):
+                screen = self._screen_factories[name]()
+            self._screens[name] = screen
+        return screen
+
+    def prebuild(self):
+        # builds the screens the user is likely to open next, a screen per
+        # step, while the app is idle
+        for name in ("game_init", "settings", "join", "Judgements"):
+            self.lazy_screen(name)
+            yield
+        if self.end_screen is None:
+            self._setup_game_screens()
+            yield
+        # opened now rather than by the end of the first game
+        self.history
+
+    def _make_setting_screen(self):
+        setting_screen = _ButtonScreen(
+            buttons=settings_buttons,
+            name='settings')
+        setting_screen.buttons[BACK].on_press = self.switch_to_menu
+        setting_screen.buttons[BACK].height = MEDIUM_HEIGHT
+        setting_screen.buttons[BACK].size_hint_y = None
+        setting_screen.buttons[
             JUDGEMENTS].on_press = self.switch_to_judgements_settings
+        setting_screen.buttons[DEBUG].height = MEDIUM_HEIGHT
+        setting_screen.buttons[DEBUG].size_hint_y = None
+        setting_screen.buttons[DEBUG].on_press = self.toggle_debug
+        setting_screen.buttons[DEBUG].text = _debug_text(
+            any(boot.read_switches(environment=False).values())
+        )
+        return setting_screen
 
-        self.add_widget(self.menu_screen)
-        self.add_widget(self.setting_screen)
-        self.add_widget(self.game_screen)
-        self.add_widget(self.judgement_settings)
+    def toggle_debug(self):
+        # the trace and start-up profile of the next launch, see boot
+        debug = not any(boot.read_switches(environment=False).values())
+        try:
+            boot.write_switches(dict.fromkeys(boot.SWITCHES, debug))
+        except OSError as error:
+            Logger.warning(f"Debug: cannot write the switches: {error}")
+            return
+        self.setting_screen.buttons[DEBUG].text = _debug_text(debug)
+
+    def _make_judgement_settings(self):
+        judgement_settings = JudgementScreen(self.game, self.catalog,
+                                             name="Judgements")
+        judgement_settings.back_button.on_press = \
+            lambda: self.switch_to_settings("right")
+        return judgement_settings
+
+    def _make_game_screen(self):
+        game_screen = GameInitScreen(self.game, self.catalog,
+                                     name="game_init")
+        game_screen.back_button.on_press = self.switch_to_menu
+        game_screen.start_button.on_press = self.init_game
+        game_screen.network_button.on_press = \
+            lambda: self.init_game(network=True)
+        return game_screen
+
+    def _make_join_screen(self):
+        join_screen = JoinScreen(name="join")
+        join_screen.back_button.on_press = self.switch_to_menu
+        return join_screen
+
+    @property
+    def setting_screen(self):
+        return self.lazy_screen("settings")
+
+    @property
+    def judgement_settings(self):
+        return self.lazy_screen("Judgements")
+
+    @property
+    def game_screen(self):
+        return self.lazy_screen("game_init")
+
+    @property
+    def join_screen(self):
+        return self.lazy_screen("join")
 
     def switch_to_settings(self, direction="left"):
         self.transition.direction = direction
         self.switch_to(self.setting_screen)
 
     def switch_to_menu(self):
+        self.end_game()
         self.transition.direction = "right"
         self.switch_to(self.menu_screen)
 
@@ -84,40 +229,231 @@ class BiasScreenManager(ScreenManager):
         self.transition.direction = "left"
         self.switch_to(self.game_screen)
 
+    def switch_to_join(self):
+        self.transition.direction = "left"
+        self.switch_to(self.join_screen)
+
     def switch_to_judgements_settings(self):
         self.transition.direction = "left"
         self.switch_to(self.judgement_settings)
 
-    def init_game(self):
-        self.game.set()
-        for judgement in self.game.judgements:
-            for player in self.game.players:
-                for jury in self.game.jury:
-                    prep_screen = PlayerPrepScreen(
-                        self, jury, name=jury
-                    )
-                    self.order_screens.append(prep_screen)
-                    self.add_widget(prep_screen)
-                    judgement_screen = VotingScreen(
-                        self, self.game, player, judgement,
-                        name=f"{jury}_vote_{judgement}_for_{player}")
-                    self.order_screens.append(judgement_screen)
-                    self.add_widget(judgement_screen)
-                transition_screen = SummaryScreen(
-                    self, self.game, player, judgement,
-                    name=f"score_{player}_{judgement}"
-                )
-                self.order_screens.append(transition_screen)
-                self.add_widget(transition_screen)
-        end_screen = EndScreen(self, self.game, name="endscreen")
-        end_screen.ok_button.on_press = self.switch_to_menu
-        self.add_widget(end_screen)
-        self.order_screens.append(end_screen)
-        for screen, next_screen in zip(self.order_screens[:-1],
-                                       self.order_screens[1:]):
-            screen.set_next_screen(next_screen)
-
-        self.switch_to(self.order_screens[0])
+    def _setup_game_screens(self):
+        # A single screen of each kind is re-bound to every step of the
+        # game, so the widget count does not depend on the game size.
+        with startup.measure("game screens"), \
+                tracer.span("build game screens"):
+            self._build_game_screens()
+
+    def _build_game_screens(self):
+        self.prep_screen = PlayerPrepScreen(self, name="prep")
+        self.host_screen = HostScreen(self, self.game, name="host")
+        self.voting_screen = VotingScreen(self, self.game, name="vote")
+        self.summary_screen = SummaryScreen(self, self.game, name="summary")
+        self.end_screen = EndScreen(self, self.game, name="endscreen")
+        self.end_screen.ok_button.on_press = self.switch_to_menu
+        if self.export_dir:
+            self.end_screen.export_button.on_press = self.export_game_files
+        else:
+            self.end_screen.export_button.disabled = True
+
+    def _attach_journal(self):
+        if self.journal_path and self.game.journal is None:
+            from journal import Journal
+            self.game.journal = Journal(self.journal_path)
+
+    @property
+    def history(self):
+        if self._history is None and self.history_path:
+            try:
+                from history import HistoryStore
+            except ImportError:
+                # a build without sqlite3 plays on without a history
+                Logger.warning("History: sqlite3 is missing, games are not "
+                               "saved")
+                self.history_path = None
+                return None
+            self._history = HistoryStore(self.history_path)
+        return self._history
+
+    @property
+    def catalog(self):
+        # names of past games, read by the first screen that suggests them
+        if self._catalog is None:
+            self._catalog = Catalog(self.catalog_path)
+        return self._catalog
+
+    def _catalog_game(self, players, jury, judgements):
+        # the names of a game are catalogued and written in frames left
+        # free, not while the game screens open
+        yield
+        self.catalog.record_game(players, jury, judgements)
+        yield
+        self.catalog.save()
+
+    def export_game_files(self):
+        # written by a worker, the label tells when the files are there
+        button = self.end_screen.export_button
+        button.disabled = True
+
+        def done(base):
+            button.disabled = False
+            self.end_screen.label.text += f"\n\nExporté : {base}.npz, .csv"
+
+        def failed(error):
+            button.disabled = False
+            self.end_screen.label.text += f"\n\nÉchec de l'export : {error}"
+
+        tasks.submit(_export_files, *self.export_session(), on_result=done,
+                     on_error=failed, key="export")
+
+    def export_session(self):
+        # the base path of the files and what to write in them, copied so
+        # that the game can be reset while they are written
+        from export import game_session
+        played_at = time.time()
+        base = os.path.join(self.export_dir, time.strftime(
+            "partie-%Y%m%d-%H%M%S", time.localtime(played_at)
+        ))
+        session = game_session(self.game, played_at)
+        votes = session.load_votes().copy()
+        return base, session._replace(load_votes=lambda: votes)
+
+    def init_game(self, network=False):
+        self._attach_journal()
+        game = self.game
+        scheduler.add(self._catalog_game(
+            list(game.players), list(game.jury), list(game.judgements)
+        ), IDLE)
+        game.set()
+        self.resume_game(network)
+
+    def resume_game(self, network=False):
+        if self.end_screen is None:
+            self._setup_game_screens()
+        # start tracking juror bias now so it is updated vote by vote
+        self.game.bias
+        self._attach_journal()
+        if network:
+            from network import VoteServer
+            server = VoteServer(self.game)
+            try:
+                server.start()
+            except OSError as error:
+                # the roster is left as it was, to try again or play locally
+                self.game.reset()
+                if self.current_screen is not self.game_screen:
+                    self.switch_to_game()
+                reason = error.strerror or error
+                self.game_screen.message.text = \
+                    f"Impossible d'ouvrir le serveur : {reason}"
+                return
+            self.server = server
+            Clock.schedule_interval(self._apply_network_votes, 1 / 30)
+        self.sequencer = TurnSequencer(self.game, parallel=network)
+        self.next_step()
+
+    def _apply_network_votes(self, _):
+        # votes received since the last frame are applied in one batch
+        if not self.server.drain():
+            return
+        screen = self.host_screen
+        if self.current_screen is screen and screen.player is not None:
+            screen.set_text()
+            if self.game.turn_complete(screen.player, screen.judgement):
+                self.next_step()
+
+    def close_round(self):
+        # the missing jurors do not count in this round's scores, votes
+        # received until now are applied and later ones refused
+        screen = self.host_screen
+        if self.server is None or self.current_screen is not screen:
+            return
+        self.server.drain()
+        self.server.close_turn()
+        self.next_step()
+
+    def end_game(self):
+        if self.sequencer is None:
+            return
+        self.sequencer = None
+        if self.server is not None:
+            Clock.unschedule(self._apply_network_votes)
+            self.server.stop()
+            self.server = None
+        for screen in (self.prep_screen, self.host_screen, self.voting_screen,
+                       self.summary_screen, self.end_screen):
+            if screen is not self.current_screen and screen in self.screens:
+                self.remove_widget(screen)
+        self.game.reset()
+
+    def can_undo(self):
+        # the last vote is taken back while its judgement is played, the
+        # turns before are over; parallel rounds are voted on the jurors'
+        # own devices
+        game = self.game
+        log = game.log
+        return self.sequencer is not None and not self.sequencer.parallel \
+            and log.can_undo and log[log.position - 1].judgement == game.turn
+
+    def undo_vote(self):
+        if not self.can_undo():
+            return
+        self.game.undo()
+        # a new sequencer skips the steps already voted, its first step is
+        # the vote taken back, the juror still holds the device so its
+        # preparation is skipped
+        self.sequencer = TurnSequencer(self.game)
+        self.sequencer.next_step()
+        self.next_step()
+
+    def next_step(self):
+        step = self.sequencer.next_step()
+        if step is None:
+            return
+        if step.kind == PREP:
+            screen = self.prep_screen
+            screen.set_jury(step.jury)
+        elif step.kind == ROUND:
+            screen = self.host_screen
+            screen.set_turn(step.player, step.judgement)
+            self.server.open_turn(step.player, step.judgement)
+        elif step.kind == VOTE:
+            screen = self.voting_screen
+            screen.set_turn(step.jury, step.player, step.judgement)
+        elif step.kind == SUMMARY:
+            screen = self.summary_screen
+            screen.set_turn(step.player, step.judgement)
+        else:
+            screen = self.end_screen
+            if self.history is not None and not self.game.saved:
+                # written in bulk by the store's own thread, the journal
+                # keeps that it was so that a relaunch does not save the
+                # game again
+                self.history.save(self.game)
+                self.game.mark_saved()
+        if screen.build_job is not None:
+            scheduler.promote(screen.build_job)
+        if screen.undo_button is not None:
+            screen.undo_button.disabled = not self.can_undo()
+        self.switch_to(screen)
+        if hasattr(screen, "set_text"):
+            screen.set_text()
+
+
+def _debug_text(debug):
+    text = f"Mode débogage : {'activé' if debug else 'désactivé'}"
+    if debug != tracer.enabled:
+        text += "\n(au prochain lancement)"
+    return text
+
+
+def _export_files(base, session):
+    # the finished game as an .npz archive and a CSV file of its votes
+    from export import export_csv, export_npz
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    export_npz(base + ".npz", [session])
+    export_csv(base + ".csv", [session])
+    return base
 
 
 class _ButtonScreen(Screen):
@@ -136,75 +472,115 @@ class _ButtonScreen(Screen):
 
 
 class GameScreen(Screen):
-    def __init__(self, screen_manager: ScreenManager, **kwargs):
+    def __init__(self, screen_manager: BiasScreenManager, **kwargs):
         super().__init__(**kwargs)
         self.screen_manager = screen_manager
-        self.next_screen = None
-
-    def set_next_screen(self, next_screen: Screen):
-        self.next_screen = next_screen
+        # widgets still being built by the scheduler, if any
+        self.build_job = None
+        self.undo_button = None
 
+    @tracer.traced("GameScreen.switch_to_next")
     def switch_to_next(self):
-        if isinstance(self.next_screen, Screen):
-            self.screen_manager.switch_to(self.next_screen)
-            if hasattr(self.next_screen, "set_text"):
-                self.next_screen.set_text()
+        self.screen_manager.next_step()
+
+    def add_undo_button(self, layout):
+        # for a juror who tapped the wrong number, shown after each vote
+        self.undo_button = Button(
+            text="Corriger le dernier vote", height=MEDIUM_HEIGHT,
+            size_hint_y=None
+        )
+        self.undo_button.on_press = self.screen_manager.undo_vote
+        layout.add_widget(self.undo_button)
 
 
 class PlayerPrepScreen(GameScreen):
-    def __init__(self, screen_manager, jury, **kwargs):
+    def __init__(self, screen_manager, **kwargs):
         super().__init__(screen_manager, **kwargs)
         layout = BoxLayout(orientation="vertical")
-        label = Label(text=f"C'est au tour de {jury} !")
-        layout.add_widget(label)
+        self.label = Label()
+        layout.add_widget(self.label)
         ok_button = Button(text="ok", height=LARGE_HEIGHT, size_hint_y=None)
         ok_button.on_press = self.switch_to_next
         layout.add_widget(ok_button)
+        self.add_undo_button(layout)
         self.add_widget(layout)
 
+    def set_jury(self, jury: str):
+        self.label.text = f"C'est au tour de {jury} !"
+
 
 class VotingScreen(GameScreen):
-    def __init__(self, screen_manager, game: Game, player: str, judgement:
-    str, **kwargs):
+    def __init__(self, screen_manager, game: Game, **kwargs):
         super().__init__(screen_manager, **kwargs)
         self.game = game
-        self.player = player
-        self.judgement = judgement
+        self.jury = None
+        self.player = None
+        self.judgement = None
         layout = BoxLayout(orientation="vertical")
-        layout.add_widget(Label(
-            text=f"{judgement.upper()} pour {player.upper()}",
-            height=LARGE_HEIGHT, size_hint_y=None,
-        ))
-        ten_button = Button(text="10", height=LARGE_HEIGHT, size_hint_y=None)
-        ten_button.on_press = lambda: self.vote(10)
-        layout.add_widget(ten_button)
-        grid_layout = GridLayout(cols=3, size_hint_y=None)
-        grid_layout.bind(minimum_height=grid_layout.setter('height'))
-
-        for i in range(9, 0, -1):
-            btn = Button(
-                text=str(i), size_hint_y=None, height=LARGE_HEIGHT,
-                on_press=lambda x: self.vote(int(x.text))
-            )
-            grid_layout.add_widget(btn)
-        layout.add_widget(grid_layout)
-        zero_button = Button(text="0", height=LARGE_HEIGHT, size_hint_y=None)
-        zero_button.on_press = lambda: self.vote(0)
-        layout.add_widget(zero_button)
+        self.label = Label(height=LARGE_HEIGHT, size_hint_y=None)
+        layout.add_widget(self.label)
         self.add_widget(layout)
+        self.build_job = scheduler.add(
+            iter_vote_buttons(layout, self.vote), SOON
+        )
+
+    def set_turn(self, jury: str, player: str, judgement: str):
+        self.jury = jury
+        self.player = player
+        self.judgement = judgement
+        self.label.text = f"{judgement.upper()} pour {player.upper()}"
 
+    @tracer.traced("VotingScreen.vote")
     def vote(self, button: int):
-        self.game.judge(self.player, self.judgement, button)
+        self.game.judge(self.player, self.judgement, button, self.jury)
         self.switch_to_next()
 
 
-class SummaryScreen(GameScreen):
-    def __init__(self, screen_manager, game: Game, player: str, judgement:
-    str, **kwargs):
-        super(SummaryScreen, self).__init__(screen_manager, **kwargs)
+class HostScreen(GameScreen):
+    def __init__(self, screen_manager, game: Game, **kwargs):
+        super().__init__(screen_manager, **kwargs)
         self.game = game
+        self.player = None
+        self.judgement = None
+        layout = BoxLayout(orientation="vertical")
+        self.label = Label()
+        layout.add_widget(self.label)
+        # a juror who never joins or whose phone drops must not hold the
+        # round: it is closed with the votes received
+        self.close_button = Button(
+            text="Clore le tour", height=MEDIUM_HEIGHT, size_hint_y=None
+        )
+        self.close_button.on_press = screen_manager.close_round
+        layout.add_widget(self.close_button)
+        self.back_button = Button(
+            text="Retour", height=MEDIUM_HEIGHT, size_hint_y=None
+        )
+        self.back_button.on_press = screen_manager.switch_to_menu
+        layout.add_widget(self.back_button)
+        self.add_widget(layout)
+
+    def set_turn(self, player: str, judgement: str):
         self.player = player
         self.judgement = judgement
+
+    def set_text(self):
+        from network import local_address
+        board = self.game.board
+        voted = int(board.count[
+            board.player_ids[self.player], board.judgement_ids[self.judgement]
+        ])
+        self.label.text = \
+            f"{self.judgement.upper()} pour {self.player.upper()}\n\n" \
+            f"{voted}/{self.game.jury_number} votes\n\n" \
+            f"Rejoindre : {local_address()}"
+
+
+class SummaryScreen(GameScreen):
+    def __init__(self, screen_manager, game: Game, **kwargs):
+        super(SummaryScreen, self).__init__(screen_manager, **kwargs)
+        self.game = game
+        self.player = None
+        self.judgement = None
         layout = BoxLayout(orientation="vertical")
         self.score_label = Label()
         layout.add_widget(self.score_label)
@@ -213,63 +589,315 @@ class SummaryScreen(GameScreen):
         ok_button = Button(text="ok", height=LARGE_HEIGHT, size_hint_y=None)
         ok_button.on_press = self.switch_to_next
         layout.add_widget(ok_button)
+        self.add_undo_button(layout)
+
+    def set_turn(self, player: str, judgement: str):
+        self.player = player
+        self.judgement = judgement
 
     def set_text(self):
         score = self.game.summarize_turn(self.player, self.judgement)
         self.score_label.text = \
             f"{self.player.upper()} a pour le trait\n" \
-            f"{self.judgement} un score moyen de\n" \
+            f"{self.judgement} un score de\n" \
             f"{score:.2f}"
 
 
 class EndScreen(GameScreen):
     def __init__(self, screen_manager, game: Game, **kwargs):
+        from kivy.uix.spinner import Spinner
+        from kivy.uix.togglebutton import ToggleButton
+        from views import StandingsView
         super(EndScreen, self).__init__(screen_manager, **kwargs)
         self.game = game
+        self._final_score = dict()
+        self._leaderboards = None
+        # bootstrap intervals of the mean scores, filled in by a worker
+        # thread as its batches finish
+        self._bootstrap = None
+        self._bootstrap_board = None
+        self._final_intervals = dict()
+        self._cell_intervals = list()
+        self._ahead = None
+        self._confidence = None
         layout = BoxLayout(orientation="vertical")
-        self.label = Label()
+        self.label = Label(height=LARGE_HEIGHT, size_hint_y=None)
         layout.add_widget(self.label)
 
-        self.ok_button = Button(
-            text="Retour", height=MEDIUM_HEIGHT, size_hint_y=None
+        self.board_spinner = Spinner(
+            text=OVERALL, values=[OVERALL], height=SMALL_HEIGHT,
+            size_hint_y=None
         )
-        layout.add_widget(self.ok_button)
+        self.board_spinner.bind(text=lambda _, board: self.show_board(board))
+        layout.add_widget(self.board_spinner)
+        self.standings_view = StandingsView()
+        layout.add_widget(self.standings_view)
+
+        # the scores are recomputed from the board, votes are not replayed
+        self.aggregation_buttons = dict()
+        aggregations = BoxLayout(height=SMALL_HEIGHT, size_hint_y=None)
+        for aggregation in aggregation_buttons:
+            button = ToggleButton(
+                text=aggregation_names[aggregation], group="aggregation",
+                allow_no_selection=False,
+                on_press=lambda _, a=aggregation: self.set_aggregation(a)
+            )
+            self.aggregation_buttons[aggregation] = button
+            aggregations.add_widget(button)
+        layout.add_widget(aggregations)
+
+        buttons = BoxLayout(height=MEDIUM_HEIGHT, size_hint_y=None)
+        self.export_button = Button(text="Exporter")
+        buttons.add_widget(self.export_button)
+        self.ok_button = Button(text="Retour")
+        buttons.add_widget(self.ok_button)
+        layout.add_widget(buttons)
         self.add_widget(layout)
 
+    def set_aggregation(self, aggregation):
+        self.game.aggregation = aggregation
+        self.set_text()
+
     def set_text(self):
-        final_score = self.game.finish_game()
-        best_player = ""
-        best_score = 0
-        worst_player = ""
-        worst_score = float('inf')
-        for quick_pass in range(2):
-            for player, score in final_score.items():
-                if score > best_score:
-                    best_player = player
-                    best_score = score
-                elif score < worst_score:
-                    worst_player = player
-                    worst_score = score
-        others = ""
-        for player, score in final_score.items():
-            others += f"{player}: {score}\n"
+        name = self.game.aggregation.partition(":")[0]
+        for aggregation, button in self.aggregation_buttons.items():
+            button.state = "down" if aggregation == name else "normal"
+        if self._bootstrap_board is not self.game.board:
+            self.start_bootstrap()
+        self._final_score = self.game.finish_game()
+        self._leaderboards = None
+        self.show_label()
+        self.board_spinner.values = [OVERALL] + list(self.game.judgements)
+        if self.board_spinner.text not in self.board_spinner.values:
+            self.board_spinner.text = OVERALL
+        else:
+            self.show_board(self.board_spinner.text)
+
+    def show_label(self):
+        final_score = self._final_score
+        best = top(final_score, 1)[0]
+        worst = bottom(final_score, 1)[0]
+        margin = ""
+        if self._ahead is not None and self.shows_intervals and \
+                len(final_score) > 1:
+            second = top(final_score, 2)[1]
+            ids = self.game.board.player_ids
+            chance = self._ahead[ids[best.player]][ids[second.player]]
+            if chance >= self._confidence:
+                margin = f", devant {second.player.upper()} à " \
+                         f"{chance * 100:.0f} %"
+            else:
+                margin = f", au coude à coude avec {second.player.upper()}"
         self.label.text = \
-            f"Le meilleur être humain est {best_player.upper()}\n" \
-            f"avec un score de {best_score}\n" \
-            f"le pire est {worst_player.upper()}\n" \
-            f"avec un score de {worst_score}.\n\n" \
-            f"les scores finaux sont :\n" \
-            f"{others}"
+            f"Le meilleur être humain est {best.player.upper()}\n" \
+            f"avec un score de {best.score:.2f}{margin}\n" \
+            f"le pire est {worst.player.upper()}\n" \
+            f"avec un score de {worst.score:.2f}."
+
+    @property
+    def shows_intervals(self):
+        # the intervals are those of the mean scores
+        return self.game.aggregation == "mean"
+
+    def show_board(self, board):
+        if board == OVERALL:
+            self.standings_view.show(standings(self._final_score),
+                                     self.board_intervals(board))
+            return
+        if self._leaderboards is None:
+            # every trait at once, from a single pass over the scores
+            self._leaderboards = leaderboards(self.game.scores)
+        self.standings_view.show(self._leaderboards[board],
+                                 self.board_intervals(board))
+
+    def board_intervals(self, board):
+        # player -> (low, high) of the shown board, for the players done
+        if not self.shows_intervals:
+            return dict()
+        if board == OVERALL:
+            return self._final_intervals
+        judgement = self.game.board.judgement_ids[board]
+        players = list(self.game.board.player_ids)
+        return {
+            players[player]: cells[player - start][judgement]
+            for start, stop, cells in self._cell_intervals
+            for player in range(start, stop)
+        }
+
+    def start_bootstrap(self):
+        board = self.game.board
+        self.cancel_bootstrap()
+        self._bootstrap_board = board
+        # started once the screen has drawn its first frame, which the
+        # worker would otherwise slow down
+        self._bootstrap = tasks.stream(
+            _bootstrap, board.votes.copy(), on_item=self._receive_bootstrap,
+            key="bootstrap", delay=.05
+        )
+
+    def cancel_bootstrap(self):
+        if self._bootstrap is not None:
+            self._bootstrap.cancel()
+        self._bootstrap = None
+        self._bootstrap_board = None
+        self._final_intervals = dict()
+        self._cell_intervals = list()
+        self._ahead = None
+
+    def _receive_bootstrap(self, result):
+        # the game may have been reset since
+        if self.game.board is not self._bootstrap_board:
+            return
+        if hasattr(result, "ahead"):
+            self._ahead = result.ahead.tolist()
+            self._confidence = result.confidence
+            self.show_label()
+            return
+        players = list(self.game.board.player_ids)
+        for player, interval in zip(range(result.start, result.stop),
+                                    result.finals.tolist()):
+            self._final_intervals[players[player]] = interval
+        self._cell_intervals.append(
+            (result.start, result.stop, result.cells.tolist())
+        )
+        self.standings_view.set_intervals(
+            self.board_intervals(self.board_spinner.text)
+        )
+
+    def on_leave(self, *args):
+        self.cancel_bootstrap()
+
+
+def _bootstrap(votes):
+    from uncertainty import bootstrap
+    return bootstrap(votes)
+
+
+class JoinScreen(Screen):
+    def __init__(self, **kwargs):
+        from kivy.uix.textinput import TextInput
+        super().__init__(**kwargs)
+        self.client = None
+        layout = BoxLayout(orientation="vertical")
+        self.label = Label(text="Rejoindre une partie")
+        layout.add_widget(self.label)
+        self.host = TextInput(
+            hint_text="Adresse", multiline=False, size_hint_y=None,
+            height=MEDIUM_HEIGHT
+        )
+        layout.add_widget(self.host)
+        self.jury = TextInput(
+            hint_text="Nom", multiline=False, size_hint_y=None,
+            height=MEDIUM_HEIGHT
+        )
+        layout.add_widget(self.jury)
+        self.join_button = Button(
+            text="Rejoindre", height=MEDIUM_HEIGHT, size_hint_y=None
+        )
+        self.join_button.on_press = self.join
+        layout.add_widget(self.join_button)
+        self.vote_buttons = add_vote_buttons(layout, self.vote)
+        self.back_button = Button(
+            text="Retour", height=MEDIUM_HEIGHT, size_hint_y=None
+        )
+        layout.add_widget(self.back_button)
+        self.add_widget(layout)
+        self.set_voting(False)
+
+    def set_voting(self, voting: bool):
+        for button in self.vote_buttons:
+            button.disabled = not voting
+
+    def join(self):
+        from network import BackgroundClient
+        if self.client is not None:
+            self.client.stop()
+        self.client = BackgroundClient(
+            self.host.text.strip(), self.jury.text.strip(),
+            lambda message: Clock.schedule_once(
+                lambda _: self.receive(message)
+            )
+        )
+        self.label.text = "Connexion..."
+        self.client.start()
+
+    def receive(self, message):
+        if "turn" in message:
+            player, judgement = message["turn"]
+            self.label.text = f"{judgement.upper()} pour {player.upper()}"
+            self.set_voting(True)
+        elif "turn_closed" in message:
+            self.label.text = "Tour clos"
+            self.set_voting(False)
+        elif "error" in message:
+            self.label.text = f"Erreur : {message['error']}"
+        elif "closed" in message:
+            self.label.text = "Partie terminée"
+            self.set_voting(False)
+            self.client = None
+
+    def vote(self, button: int):
+        self.set_voting(False)
+        self.label.text = "Vote envoyé"
+        self.client.vote(button)
+
+    def on_leave(self, *args):
+        if self.client is not None:
+            self.client.stop()
+            self.client = None
+        self.set_voting(False)
+
+
+class ChoiceBar(BoxLayout):
+    # A row of buttons built once and relabelled as the choices change, an
+    # unused button is hidden rather than removed
+    def __init__(self, size, on_choose, **kwargs):
+        super().__init__(orientation="horizontal", size_hint_y=None,
+                         height=SMALL_HEIGHT, spacing=5, **kwargs)
+        self.on_choose = on_choose
+        self.choices = list()
+        self.buttons = [
+            Button(on_press=lambda _, i=i: self.choose(i))
+            for i in range(size)
+        ]
+        for button in self.buttons:
+            self.add_widget(button)
+        self.show(())
+
+    def show(self, choices, labels=None):
+        self.choices = list(choices)
+        labels = self.choices if labels is None else list(labels)
+        for i, button in enumerate(self.buttons):
+            shown = i < len(self.choices)
+            button.text = labels[i] if shown else ""
+            button.disabled = not shown
+            button.opacity = 1 if shown else 0
+
+    def choose(self, index):
+        if index < len(self.choices):
+            self.on_choose(self.choices[index])
+
+
+def _preset_text(preset):
+    shown = ", ".join(preset.players[:2])
+    more = len(preset.players) - 2
+    return f"{shown} +{more}" if more > 0 else shown
 
 
 class GameInitScreen(Screen):
-    def __init__(self, game: Game, **kwargs):
+    def __init__(self, game: Game, catalog: Catalog = None, **kwargs):
+        from kivy.uix.textinput import TextInput
+        from views import RosterView
         super().__init__(**kwargs)
         self.game = game
+        self.catalog = catalog
         layout = BoxLayout(orientation="vertical")
         layout.add_widget(Label(
             text="Joueurs et joueuses", height=LARGE_HEIGHT, size_hint_y=None
         ))
+        # why the last game could not start, if it could not
+        self.message = Label(height=SMALL_HEIGHT, size_hint_y=None)
+        layout.add_widget(self.message)
         add_layout = BoxLayout(
             orientation="horizontal", size_hint_y=None, height=MEDIUM_HEIGHT
         )
@@ -284,85 +912,116 @@ class GameInitScreen(Screen):
         add_layout.add_widget(self.new_player)
         add_layout.add_widget(add_button)
         layout.add_widget(add_layout)
-        self.scroll_layout = GridLayout(cols=1, spacing=10, size_hint_y=None)
-        # Make sure the height is such that there is something to scroll.
-        self.scroll_layout.bind(
-            minimum_height=self.scroll_layout.setter('height')
+        # names of past games matching what is typed, and the latest rosters
+        self.suggestions = ChoiceBar(SUGGESTIONS, self.add_player_to_game)
+        layout.add_widget(self.suggestions)
+        self.presets = ChoiceBar(PRESETS, self.add_preset)
+        layout.add_widget(self.presets)
+        self.new_player.bind(text=lambda _, text: self.show_suggestions())
+        self.roster_view = RosterView(
+            on_toggle=self.toggle_presence, on_remove=self.remove_player_row
         )
-        scroll_view = ScrollView()
-        scroll_view.add_widget(self.scroll_layout)
-        layout.add_widget(scroll_view)
+        layout.add_widget(self.roster_view)
         self.start_button = Button(
             text="Démarrer !", height=LARGE_HEIGHT, size_hint_y=None
         )
         self.start_button.disabled = True
         layout.add_widget(self.start_button)
+        self.network_button = Button(
+            text="Démarrer en réseau", height=MEDIUM_HEIGHT, size_hint_y=None
+        )
+        self.network_button.disabled = True
+        layout.add_widget(self.network_button)
         self.back_button = Button(
             text="Retour", height=MEDIUM_HEIGHT, size_hint_y=None
         )
         layout.add_widget(self.back_button)
         self.add_widget(layout)
 
+    def on_pre_enter(self, *args):
+        self.message.text = ""
         self.display_players()
+        self.show_suggestions()
+        if self.catalog is not None:
+            presets = self.catalog.presets
+            self.presets.show(presets, map(_preset_text, presets))
 
-    def display_players(self):
-        def presence_factory(_p):
-            def _verify_presence(btn: Button):
-                if _p not in self.game.jury:
-                    self.game.add_jury(_p)
-                    btn.text = "Présent(e)"
-                else:
-                    self.game.remove_jury(_p)
-                    btn.text = "Absent(e)"
-                self.start_button.disabled = not self.game.can_start
-            return _verify_presence
-
-        def remove_factory(_p):
-            def _remove_player(_):
-                self.remove_player(_p)
-            return _remove_player
-
-        self.scroll_layout.clear_widgets()
-        for player in self.game.players:
-            _l = BoxLayout(
-                orientation="horizontal", size_hint_y=None, height=SMALL_HEIGHT
-            )
-            _l.add_widget(Label(
-                text=player, size_hint_y=None, height=SMALL_HEIGHT
+    def show_suggestions(self):
+        if self.catalog is not None:
+            self.suggestions.show(self.catalog.suggest(
+                PLAYERS, self.new_player.text, exclude=self.game.players
             ))
-            checker = presence_factory(player)
-            presence_button = Button(
-                size_hint_y=None, height=SMALL_HEIGHT,
-                width=SMALL_WIDTH, size_hint_x=None, on_press=checker
-            )
-            presence_button.text = "Présent(e)" if player in self.game.jury \
-                else "Absent(e)"
-            _l.add_widget(presence_button)
-            remover = remove_factory(player)
-            remover_button = Button(
-                text="Supprimer", size_hint_y=None, height=SMALL_HEIGHT,
-                width=SMALL_WIDTH, size_hint_x=None, on_press=remover
-            )
-            _l.add_widget(remover_button)
-            self.scroll_layout.add_widget(_l)
+
+    def display_players(self):
+        self.roster_view.fill(self._row(p) for p in list(self.game.players))
+        self.set_can_start()
+
+    def _row(self, player):
+        return {"text": player, "present": player in self.game.jury}
+
+    def set_can_start(self):
         self.start_button.disabled = not self.game.can_start
+        self.network_button.disabled = not self.game.can_start
 
-    def add_player_to_game(self):
-        self.game.add_player(self.new_player.text)
-        self.game.add_jury(self.new_player.text)
-        self.new_player.text = ""
-        self.display_players()
+    def toggle_presence(self, _, index):
+        self.roster_view.settle()
+        player = self.roster_view.data[index]["text"]
+        if player not in self.game.jury:
+            self.game.add_jury(player)
+        else:
+            self.game.remove_jury(player)
+        # only this row is refreshed
+        self.roster_view.data[index] = self._row(player)
+        self.set_can_start()
+
+    def add_player_to_game(self, player=None):
+        # the typed name, or a suggestion
+        player = (self.new_player.text if player is None else player).strip()
+        if not player or player in self.game.players:
+            return
+        self.roster_view.settle()
+        self.game.add_player(player)
+        if player not in self.game.jury:
+            self.game.add_jury(player)
+        self.roster_view.data.append(self._row(player))
+        if self.new_player.text:
+            self.new_player.text = ""
+        else:
+            self.show_suggestions()
+        self.set_can_start()
+
+    def add_preset(self, preset):
+        # a whole roster in one go, the list is refreshed a single time
+        self.roster_view.settle()
+        game = self.game
+        game.add_players(*[p for p in preset.players if p not in game.players])
+        game.add_juries(*[p for p in preset.jury if p not in game.jury])
+        self.roster_view.data = [self._row(p) for p in list(game.players)]
+        self.show_suggestions()
+        self.set_can_start()
 
-    def remove_player(self, player):
+    def remove_player_row(self, _, index):
+        self.remove_player(self.roster_view.data[index]["text"], index)
+        self.show_suggestions()
+
+    def remove_player(self, player, index=None):
+        self.roster_view.settle()
         self.game.remove_player(player)
         self.game.remove_jury(player)
-        self.display_players()
+        if index is None:
+            index = next(i for i, row in enumerate(self.roster_view.data)
+                         if row["text"] == player)
+        del self.roster_view.data[index]
+        self.set_can_start()
 
 
 class JudgementScreen(Screen):
-    def __init__(self, game: Game, **kwargs):
+    def __init__(self, game: Game, catalog: Catalog = None, **kwargs):
+        from kivy.uix.textinput import TextInput
+        from views import RosterView
         super(JudgementScreen, self).__init__(**kwargs)
         self.game = game
+        self.catalog = catalog
         layout = BoxLayout(orientation="vertical")
         layout.add_widget(Label(
             text="Jugements", height=LARGE_HEIGHT, size_hint_y=None
@@ -381,57 +1040,176 @@ class JudgementScreen(Screen):
         add_layout.add_widget(self.new_judgement)
         add_layout.add_widget(add_button)
         layout.add_widget(add_layout)
-        self.scroll_layout = GridLayout(cols=1, spacing=10, size_hint_y=None)
-        # Make sure the height is such that there is something to scroll.
-        self.scroll_layout.bind(
-            minimum_height=self.scroll_layout.setter('height')
-        )
-        scroll_view = ScrollView()
-        scroll_view.add_widget(self.scroll_layout)
-        layout.add_widget(scroll_view)
+        self.suggestions = ChoiceBar(SUGGESTIONS, self.add_judgement_to_game)
+        layout.add_widget(self.suggestions)
+        self.new_judgement.bind(text=lambda _, text: self.show_suggestions())
+        self.roster_view = RosterView(on_remove=self.remove_judgement_row)
+        layout.add_widget(self.roster_view)
         self.back_button = Button(
             text="Retour", height=MEDIUM_HEIGHT, size_hint_y=None
         )
         layout.add_widget(self.back_button)
         self.add_widget(layout)
+
+    def on_pre_enter(self, *args):
         self.display_judgements()
+        self.show_suggestions()
 
-    def display_judgements(self):
-        def remove_factory(_j):
-            def _remove_judgement(_):
-                self.remove_judgement(_j)
-            return _remove_judgement
-
-        self.scroll_layout.clear_widgets()
-        for judgement in self.game.judgements:
-            _l = BoxLayout(
-                orientation="horizontal", size_hint_y=None, height=SMALL_HEIGHT
-            )
-            _l.add_widget(Label(
-                text=judgement, size_hint_y=None, height=SMALL_HEIGHT
+    def show_suggestions(self):
+        if self.catalog is not None:
+            self.suggestions.show(self.catalog.suggest(
+                JUDGEMENT_NAMES, self.new_judgement.text,
+                exclude=self.game.judgements
             ))
-            remover = remove_factory(judgement)
-            _b = Button(
-                text="Supprimer", size_hint_y=None, height=SMALL_HEIGHT,
-                width=SMALL_WIDTH, size_hint_x=None, on_press=remover
-            )
-            _l.add_widget(_b)
-            self.scroll_layout.add_widget(_l)
+
+    def display_judgements(self):
+        self.roster_view.fill(
+            {"text": j, "show_presence": False}
+            for j in list(self.game.judgements)
+        )
         self.back_button.disabled = self.game.judgment_number == 0
 
-    def add_judgement_to_game(self):
-        self.game.add_judgement(self.new_judgement.text)
-        self.new_judgement.text = ""
-        self.display_judgements()
+    def add_judgement_to_game(self, judgement=None):
+        # the typed judgement, or a suggestion
+        judgement = (self.new_judgement.text if judgement is None
+                     else judgement).strip()
+        if not judgement or judgement in self.game.judgements:
+            return
+        self.roster_view.settle()
+        self.game.add_judgement(judgement)
+        self.roster_view.data.append(
+            {"text": judgement, "show_presence": False}
+        )
+        if self.new_judgement.text:
+            self.new_judgement.text = ""
+        else:
+            self.show_suggestions()
+        self.back_button.disabled = self.game.judgment_number == 0
+
+    def remove_judgement_row(self, _, index):
+        self.roster_view.settle()
+        self.game.remove_judgement(self.roster_view.data[index]["text"])
+        del self.roster_view.data[index]
+        self.show_suggestions()
+        self.back_button.disabled = self.game.judgment_number == 0
 
     def remove_judgement(self, judgement):
         self.game.remove_judgement(judgement)
         self.display_judgements()
 
 
+class PerfOverlay(BoxLayout):
+    # Debug panel over the top half of the window with the traced hot
+    # paths, hidden until toggled, see BiasApp.toggle_overlay.
+    def __init__(self, trace_path, **kwargs):
+        super().__init__(orientation="vertical", size_hint=(1, .5), **kwargs)
+        self.trace_path = trace_path
+        self._event = None
+        with self.canvas.before:
+            Color(0, 0, 0, .8)
+            self._background = Rectangle()
+        self.bind(pos=self._redraw, size=self._redraw)
+        self.label = Label(halign="left", valign="top",
+                           font_name="RobotoMono-Regular")
+        self.label.bind(size=self.label.setter("text_size"))
+        self.add_widget(self.label)
+        export_button = Button(text="Exporter la trace",
+                               height=SMALL_HEIGHT, size_hint_y=None)
+        export_button.on_press = self.export
+        self.add_widget(export_button)
+
+    def _redraw(self, *_):
+        self._background.pos = self.pos
+        self._background.size = self.size
+
+    def show(self, window):
+        window.add_widget(self)
+        self.y = window.height - self.height
+        self.refresh()
+        self._event = Clock.schedule_interval(self.refresh, .5)
+
+    def hide(self, window):
+        self._event.cancel()
+        self._event = None
+        window.remove_widget(self)
+
+    @property
+    def shown(self):
+        return self._event is not None
+
+    def refresh(self, *_):
+        lines = [f"{'':<28}{'n':>6}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}"]
+        for label, count, *seconds in tracer.summary():
+            times = "".join(f"{s * 1e3:8.2f}" for s in seconds)
+            lines.append(f"{label[:28]:<28}{count:>6}{times}")
+        self.label.text = "\n".join(lines)
+
+    def export(self):
+        path = tracer.export(self.trace_path)
+        self.label.text = f"Trace : {path}\n" + self.label.text
+
+
 class BiasApp(App):
     def build(self):
-        return BiasScreenManager()
+        return BiasScreenManager(
+            journal_path=os.path.join(self.user_data_dir, "journal.bin"),
+            history_path=os.path.join(self.user_data_dir, "history.db"),
+            export_dir=os.path.join(self.user_data_dir, "exports"),
+            catalog_path=os.path.join(self.user_data_dir, "catalog.json")
+        )
+
+    def on_start(self):
+        scheduler.add(self.root.prebuild(), IDLE)
+        if startup.enabled:
+            from kivy.core.window import Window
+
+            def first_frame(*_):
+                Window.unbind(on_flip=first_frame)
+                startup.mark("first frame")
+                startup.report()
+            Window.bind(on_flip=first_frame)
+        if tracer.enabled:
+            from kivy.core.window import Window
+            tracer.watch_frames()
+            self.overlay = PerfOverlay(
+                os.path.join(self.user_data_dir, "trace.json")
+            )
+            Window.bind(on_keyboard=self._overlay_key,
+                        on_touch_down=self._overlay_touch)
+
+    def toggle_overlay(self):
+        from kivy.core.window import Window
+        if self.overlay.shown:
+            self.overlay.hide(Window)
+        else:
+            self.overlay.show(Window)
+
+    def _overlay_key(self, _, key, *args):
+        if key == 293:  # F12
+            self.toggle_overlay()
+            return True
+
+    def _overlay_touch(self, window, touch):
+        # a triple tap in the top left corner
+        corner = SMALL_HEIGHT
+        if touch.is_triple_tap and touch.x < corner \
+                and touch.y > window.height - corner:
+            self.toggle_overlay()
+            return True
+
+    def on_pause(self):
+        if self.root.game.journal is not None:
+            self.root.game.journal.flush()
+        return True
+
+    def on_stop(self):
+        tasks.shutdown()
+        if tracer.enabled:
+            tracer.export(self.overlay.trace_path)
+        if self.root.game.journal is not None:
+            self.root.game.journal.close()
+        if self.root._history is not None:
+            self.root._history.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import queue
+import socket
+import threading
+import time
+
+from game import Game
+
+PORT = 8765
+
+
+def local_address():
+    # no packet is sent, this only picks the interface of the default route
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        try:
+            probe.connect(("10.255.255.255", 1))
+            return probe.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
+
+
+def _encode(message):
+    return (json.dumps(message) + "\n").encode()
+
+
+class VoteServer:
+    def __init__(self, game: Game, host="0.0.0.0", port=PORT):
+        self.game = game
+        self.host = host
+        self.port = port
+        self.turn = None
+        self._votes = queue.SimpleQueue()
+        self._voted = set()
+        self._writers = dict()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._error = None
+
+    def start(self):
+        # raises the OSError of a port already in use or of sockets the app
+        # may not open
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready,), daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._loop = None
+            raise self._error
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as error:
+            self._error = error
+            self._loop.close()
+            return
+        finally:
+            # start() waits for the server, or for its error
+            ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._close)
+        self._thread.join()
+        self._loop = None
+
+    def _close(self):
+        for writer in self._writers.values():
+            writer.write(_encode({"closed": True}))
+            writer.close()
+        self._writers.clear()
+        self._loop.stop()
+
+    def open_turn(self, player, judgement):
+        self._loop.call_soon_threadsafe(self._open_turn, player, judgement)
+
+    def _open_turn(self, player, judgement):
+        self.turn = (player, judgement)
+        self._voted.clear()
+        message = _encode({"turn": self.turn})
+        for writer in self._writers.values():
+            writer.write(message)
+
+    def close_turn(self):
+        self._loop.call_soon_threadsafe(self._close_turn)
+
+    def _close_turn(self):
+        # the jurors who did not vote are told they no longer can
+        self.turn = None
+        message = _encode({"turn_closed": True})
+        for writer in self._writers.values():
+            writer.write(message)
+
+    async def _handle(self, reader, writer):
+        jury = None
+        try:
+            hello = json.loads(await reader.readline() or "{}")
+            jury = hello.get("hello")
+            if jury not in self.game.jury or jury in self._writers:
+                writer.write(_encode({"error": "unknown jury"}))
+                return
+            self._writers[jury] = writer
+            if self.turn is not None and jury not in self._voted:
+                writer.write(_encode({"turn": self.turn}))
+            async for line in reader:
+                writer.write(_encode(self._receive(jury, json.loads(line))))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if self._writers.get(jury) is writer:
+                del self._writers[jury]
+            writer.close()
+
+    def _receive(self, jury, message):
+        vote = message.get("vote")
+        if self.turn is None or jury in self._voted:
+            return {"error": "no open turn"}
+        if not isinstance(vote, int) or not 0 <= vote <= 10:
+            return {"error": "invalid vote"}
+        self._voted.add(jury)
+        self._votes.put((jury,) + self.turn + (vote,))
+        return {"ok": True}
+
+    def drain(self):
+        # called from the host main loop: applies every vote received
+        # since the last call in one batch
+        votes = list()
+        while True:
+            try:
+                votes.append(self._votes.get_nowait())
+            except queue.Empty:
+                break
+        if votes:
+            jury, players, judgements, values = zip(*votes)
+            self.game.judge_many(players, judgements, values, jury)
+        return votes
+
+
+class VoteClient:
+    def __init__(self, jury):
+        self.jury = jury
+        self._reader = None
+        self._writer = None
+
+    async def connect(self, host, port=PORT):
+        self._reader, self._writer = await asyncio.open_connection(
+            host, port
+        )
+        self._writer.write(_encode({"hello": self.jury}))
+        await self._writer.drain()
+
+    async def receive(self):
+        line = await self._reader.readline()
+        return json.loads(line) if line else {"closed": True}
+
+    async def vote(self, vote: int):
+        self._writer.write(_encode({"vote": vote}))
+        await self._writer.drain()
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class BackgroundClient:
+    # runs a VoteClient on its own thread; callbacks are called from that
+    # thread with every message received from the host
+    def __init__(self, host, jury, on_message, port=PORT):
+        self.client = VoteClient(jury)
+        self.host = host
+        self.port = port
+        self.on_message = on_message
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+        finally:
+            self._loop.close()
+
+    async def _listen(self):
+        try:
+            await self.client.connect(self.host, self.port)
+        except OSError:
+            self.on_message({"error": "connection failed"})
+            return
+        while True:
+            message = await self.client.receive()
+            self.on_message(message)
+            if "closed" in message or \
+                    message.get("error") == "unknown jury":
+                break
+        await self.client.close()
+
+    def vote(self, vote: int):
+        asyncio.run_coroutine_threadsafe(self.client.vote(vote), self._loop)
+
+    def stop(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self.client.close())
+            )
+
+
+async def simulated_jury(host, port, jury, vote):
+    client = VoteClient(jury)
+    await client.connect(host, port)
+    while True:
+        message = await client.receive()
+        if "closed" in message:
+            break
+        if "turn" in message:
+            await client.vote(vote(jury, *message["turn"]))
+    await client.close()
+
+
+if __name__ == '__main__':
+    def bench_round(jury_number, rounds=5, frame=1 / 60):
+        jury = [f"J{i}" for i in range(jury_number)]
+        game = Game(players=["A", "B"], jury=jury,
+                    judgements=[f"T{i}" for i in range(rounds)])
+        game.set()
+        server = VoteServer(game, host="127.0.0.1", port=0)
+        server.start()
+
+        async def run_jury():
+            await asyncio.gather(*(
+                simulated_jury("127.0.0.1", server.port, j, lambda *_: 5)
+                for j in jury
+            ))
+
+        clients = threading.Thread(target=asyncio.run, args=(run_jury(),))
+        clients.start()
+        while len(server._writers) < jury_number:
+            time.sleep(frame)
+        durations = list()
+        for judgement in game.judgements:
+            start = time.perf_counter()
+            server.open_turn("A", judgement)
+            # the host applies votes once per frame, like the Kivy Clock
+            while not game.turn_complete("A", judgement):
+                time.sleep(frame)
+                server.drain()
+            durations.append(time.perf_counter() - start)
+        server.stop()
+        clients.join()
+        return sorted(durations)[len(durations) // 2]
+
+    for size in (4, 12, 50, 200):
+        duration = bench_round(size)
+        print(f"{size} jurors: round closed in {duration * 1e3:.1f} ms "
+              f"({size / duration:.0f} votes/s)")
@@ -0,0 +1,140 @@
+import functools
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# spans kept per label, the oldest are dropped first
+TRACE_SIZE = 2048
+
+
+class StartupProfile:
+    def __init__(self, start, enabled=False):
+        self.start = start
+        self.enabled = enabled
+        self._last = start
+        self.marks = list()  # (label, seconds)
+        self.reported = False
+
+    def mark(self, label):
+        # time spent since the previous mark
+        now = time.perf_counter()
+        if self.enabled:
+            self.marks.append((label, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def measure(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.marks.append((label, time.perf_counter() - start))
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        from kivy.logger import Logger
+        total = time.perf_counter() - self.start
+        for label, seconds in self.marks:
+            Logger.info(f"Startup: {label:<24} {seconds * 1e3:8.1f} ms")
+        Logger.info(f"Startup: {'total':<24} {total * 1e3:8.1f} ms")
+
+
+class Tracer:
+    # Times hot paths into fixed-size ring buffers. Whether tracing is on is
+    # decided when a function is decorated, so a disabled tracer leaves the
+    # function untouched and costs nothing.
+    def __init__(self, enabled=False, size=TRACE_SIZE):
+        self.enabled = enabled
+        self.size = size
+        self.start = time.perf_counter()
+        self.spans = dict()  # label -> deque of (start, seconds)
+        self._frame_event = None
+
+    def _buffer(self, label):
+        spans = self.spans.get(label)
+        if spans is None:
+            spans = self.spans[label] = deque(maxlen=self.size)
+        return spans
+
+    def traced(self, label):
+        def decorate(function):
+            if not self.enabled:
+                return function
+            spans = self._buffer(label)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    spans.append((start, time.perf_counter() - start))
+            return wrapper
+        return decorate
+
+    @contextmanager
+    def span(self, label):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(label, start, time.perf_counter() - start)
+
+    def record(self, label, start, seconds):
+        self._buffer(label).append((start, seconds))
+
+    def watch_frames(self):
+        # the time between two frames, as seen by the Kivy clock
+        if not self.enabled or self._frame_event is not None:
+            return
+        from kivy.clock import Clock
+        spans = self._buffer("frame")
+
+        def frame(dt):
+            now = time.perf_counter()
+            spans.append((now - dt, dt))
+        self._frame_event = Clock.schedule_interval(frame, 0)
+
+    def percentiles(self, label, quantiles=(.5, .9, .99)):
+        durations = sorted(seconds for _, seconds in self.spans.get(label, ()))
+        if not durations:
+            return [0.] * len(quantiles)
+        last = len(durations) - 1
+        return [durations[round(q * last)] for q in quantiles]
+
+    def summary(self):
+        # (label, count, p50, p90, p99, max), in seconds
+        rows = list()
+        for label, spans in sorted(self.spans.items()):
+            if spans:
+                p50, p90, p99, top = self.percentiles(label, (.5, .9, .99, 1))
+                rows.append((label, len(spans), p50, p90, p99, top))
+        return rows
+
+    def export(self, path):
+        # Chrome trace event format, opens in chrome://tracing or Perfetto
+        pid = os.getpid()
+        events = list()
+        for tid, (label, spans) in enumerate(sorted(self.spans.items())):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid,
+                           "tid": tid, "args": {"name": label}})
+            for start, seconds in spans:
+                events.append({
+                    "name": label, "ph": "X", "pid": pid, "tid": tid,
+                    "ts": (start - self.start) * 1e6, "dur": seconds * 1e6,
+                })
+        with open(path, "w") as output:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"},
+                      output)
+        return path
+
+
+tracer = Tracer(enabled=bool(os.environ.get("BIAS_TRACE")))
@@ -0,0 +1,76 @@
+import bisect
+import heapq
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+# scores equal up to this many digits share a rank
+TIE_DIGITS = 9
+
+Standing = namedtuple("Standing", ["rank", "player", "score"])
+
+
+def _tie_key(item):
+    return round(item[1], TIE_DIGITS)
+
+
+def standings(scores: Dict[str, float]) -> List[Standing]:
+    # Competition ranking ("1224"): tied players share the best rank and
+    # keep the order of `scores`, the next rank skips as many places.
+    ordered = sorted(scores.items(), key=_tie_key, reverse=True)
+    return list(_ranked(ordered))
+
+
+def _ranked(ordered):
+    rank = 1
+    previous = None
+    for position, (player, score) in enumerate(ordered, 1):
+        key = round(score, TIE_DIGITS)
+        if key != previous:
+            rank = position
+            previous = key
+        yield Standing(rank, player, score)
+
+
+def _ranks(values, scores):
+    # competition rank among all `scores` of each of the k `values`, in
+    # O(N log k): one bisection into the distinct values per score
+    ordered = sorted({round(value, TIE_DIGITS) for value in values})
+    between = [0] * (len(ordered) + 1)
+    for score in scores:
+        between[bisect.bisect_left(ordered, round(score, TIE_DIGITS))] += 1
+    above = dict()
+    running = 0
+    for i in range(len(ordered) - 1, -1, -1):
+        running += between[i + 1]
+        above[ordered[i]] = running
+    return [above[round(value, TIE_DIGITS)] + 1 for value in values]
+
+
+def top(scores: Dict[str, float], k: int) -> List[Standing]:
+    # the k best players, best first, ties in the order of `scores`
+    best = heapq.nlargest(k, scores.items(), key=_tie_key)
+    ranks = _ranks([score for _, score in best], scores.values())
+    return [Standing(rank, player, score)
+            for rank, (player, score) in zip(ranks, best)]
+
+
+def bottom(scores: Dict[str, float], k: int) -> List[Standing]:
+    # the k worst players, worst first
+    worst = heapq.nsmallest(k, scores.items(), key=_tie_key)
+    ranks = _ranks([score for _, score in worst], scores.values())
+    return [Standing(rank, player, score)
+            for rank, (player, score) in zip(ranks, worst)]
+
+
+def leaderboards(scores: Dict[str, Dict[str, float]],
+                 k: Optional[int] = None) -> Dict[str, List[Standing]]:
+    # a leaderboard per judgement from Game.scores, the k best when given
+    by_judgement = dict()  # type: Dict[str, Dict[str, float]]
+    for player, judgements in scores.items():
+        for judgement, score in judgements.items():
+            by_judgement.setdefault(judgement, dict())[player] = score
+    if k is None:
+        return {judgement: standings(board)
+                for judgement, board in by_judgement.items()}
+    return {judgement: top(board, k)
+            for judgement, board in by_judgement.items()}
@@ -0,0 +1,112 @@
+import random
+import sys
+
+
+class NameTable:
+    # Every player, juror and judgement name of a game, interned: a player
+    # who is also a juror is a single string object, and each name keeps
+    # one id for the game. A table goes with its game, so that scoring many
+    # sessions does not keep all of their names.
+    def __init__(self):
+        self._ids = dict()
+        self._names = list()
+
+    def intern(self, name: str) -> str:
+        return self._names[self.id(name)]
+
+    def id(self, name: str) -> int:
+        id_ = self._ids.get(name)
+        if id_ is None:
+            if type(name) is str:
+                name = sys.intern(name)
+            id_ = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return id_
+
+    def name(self, id_: int) -> str:
+        return self._names[id_]
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __len__(self):
+        return len(self._names)
+
+
+class Roster:
+    def __init__(self, names=(), table: NameTable = None):
+        # the names are interned in `table`, shared by the rosters of a game
+        self.table = NameTable() if table is None else table
+        # name -> id, the dict order is the roster order
+        self._ids = dict()
+        # id -> name, None where a name was removed
+        self._names = list()
+        for name in names:
+            self.add(name)
+
+    def add(self, name) -> int:
+        if name in self._ids:
+            raise ValueError(f"{name!r} is already in the roster")
+        name = self.table.intern(name)
+        self._ids[name] = len(self._names)
+        self._names.append(name)
+        return self._ids[name]
+
+    def remove(self, name):
+        self._names[self._ids.pop(name)] = None
+
+    def discard(self, name):
+        if name in self._ids:
+            self.remove(name)
+
+    def id(self, name) -> int:
+        return self._ids[name]
+
+    def name(self, id_: int):
+        name = self._names[id_]
+        if name is None:
+            raise KeyError(id_)
+        return name
+
+    @property
+    def ids(self):
+        return self._ids
+
+    def shuffle(self, rng=random):
+        order = list(self._ids)
+        rng.shuffle(order)
+        self.reorder(order)
+
+    def reorder(self, order):
+        ids = self._ids
+        if len(order) != len(ids):
+            raise ValueError("the new order must hold every name once")
+        self._ids = {self.table.intern(name): ids[name] for name in order}
+        if len(self._ids) != len(ids):
+            raise ValueError("the new order must hold every name once")
+
+    def compact(self):
+        # renumber the ids densely in the roster order, ids are only stable
+        # between two compactions
+        self._ids = {name: i for i, name in enumerate(self._ids)}
+        self._names = list(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        return list(self._ids)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Roster):
+            return list(self._ids) == list(other._ids)
+        return list(self._ids) == list(other)
+
+    def __repr__(self):
+        return f"Roster({list(self._ids)!r})"
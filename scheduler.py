@@ -0,0 +1,81 @@
+import heapq
+import itertools
+import time
+
+from kivy.clock import Clock
+
+VISIBLE = 0
+SOON = 5
+IDLE = 10
+
+FRAME_BUDGET = 0.008
+
+
+class FrameScheduler:
+    # Runs generator jobs a step at a time, a few steps per frame, so that
+    # building many widgets never blocks one long frame. Jobs with the
+    # lowest priority value go first, IDLE jobs only run in frames left
+    # free by the others.
+    def __init__(self, budget=FRAME_BUDGET):
+        self.budget = budget
+        self._heap = list()
+        self._entries = dict()  # job -> heap entry
+        self._counter = itertools.count()
+        self._event = None
+
+    def add(self, job, priority=VISIBLE):
+        self._push(job, priority)
+        return job
+
+    def _push(self, job, priority):
+        entry = [priority, next(self._counter), job]
+        self._entries[job] = entry
+        heapq.heappush(self._heap, entry)
+        if self._event is None:
+            self._event = Clock.schedule_once(self._run, 0)
+
+    def promote(self, job, priority=VISIBLE):
+        entry = self._entries.get(job)
+        if entry is not None and entry[0] > priority:
+            self.cancel(job)
+            self._push(job, priority)
+
+    def cancel(self, job):
+        entry = self._entries.pop(job, None)
+        if entry is not None:
+            # lazily dropped from the heap
+            entry[2] = None
+
+    def finish(self, job):
+        # the result is needed right now: run what is left of the job
+        if self._entries.pop(job, None) is None:
+            return
+        for _ in job:
+            pass
+
+    def pending(self, job):
+        return job in self._entries
+
+    def _run(self, _):
+        self._event = None
+        deadline = time.perf_counter() + self.budget
+        heap = self._heap
+        while heap and time.perf_counter() < deadline:
+            entry = heap[0]
+            job = entry[2]
+            if job is None:
+                heapq.heappop(heap)
+                continue
+            try:
+                next(job)
+            except StopIteration:
+                # the job may have queued others, leave the heap to _run
+                entry[2] = None
+                self._entries.pop(job, None)
+        if not any(entry[2] is not None for entry in heap):
+            heap.clear()
+        elif self._event is None:
+            self._event = Clock.schedule_once(self._run, 0)
+
+
+scheduler = FrameScheduler()
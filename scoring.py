@@ -0,0 +1,133 @@
+import numpy as np
+
+NO_VOTE = -1
+
+
+class ScoreBoard:
+    def __init__(self, players, judgements, jury):
+        self.player_ids = {p: i for i, p in enumerate(players)}
+        self.judgement_ids = {j: i for i, j in enumerate(judgements)}
+        self.jury_ids = {j: i for i, j in enumerate(jury)}
+        # raw votes, (players, judgements, jury), NO_VOTE where missing
+        self.votes = np.full(
+            (len(self.player_ids), len(self.judgement_ids),
+             len(self.jury_ids)),
+            NO_VOTE, dtype=np.int8
+        )
+        # running accumulators per (player, judgement) cell
+        self.count = np.zeros(self.votes.shape[:2], dtype=np.int32)
+        self.sum = np.zeros(self.votes.shape[:2], dtype=np.int64)
+        self.sum_sq = np.zeros(self.votes.shape[:2], dtype=np.int64)
+        self.listeners = list()
+
+    def load(self, votes):
+        self.votes[...] = votes
+        voted = self.voted
+        values = np.where(voted, self.votes, 0).astype(np.int64)
+        self.count[...] = voted.sum(axis=2)
+        self.sum[...] = values.sum(axis=2)
+        self.sum_sq[...] = (values ** 2).sum(axis=2)
+        for listener in self.listeners:
+            listener.rebuild()
+
+    @property
+    def shape(self):
+        return self.votes.shape
+
+    def judge(self, player: int, judgement: int, jury: int, vote: int):
+        # NO_VOTE takes a vote back, returns the value replaced
+        previous = int(self.votes[player, judgement, jury])
+        if previous != NO_VOTE:
+            self.count[player, judgement] -= 1
+            self.sum[player, judgement] -= previous
+            self.sum_sq[player, judgement] -= previous * previous
+        self.votes[player, judgement, jury] = vote
+        if vote != NO_VOTE:
+            self.count[player, judgement] += 1
+            self.sum[player, judgement] += vote
+            self.sum_sq[player, judgement] += vote * vote
+        for listener in self.listeners:
+            listener.vote(player, judgement, jury, previous)
+        return previous
+
+    def judge_many(self, players, judgements, jury, votes):
+        # returns the value each vote replaced, in order: a slot voted twice
+        # replaced its own first vote the second time
+        votes = np.asarray(votes, dtype=np.int64)
+        if not len(votes):
+            # empty id lists would be read as floats by ravel_multi_index
+            return np.empty(0, dtype=self.votes.dtype)
+        if votes.min() < 0 or votes.max() > 10:
+            raise ValueError
+        flat = np.ravel_multi_index((players, judgements, jury), self.shape)
+        order = np.argsort(flat, kind="stable")
+        ordered = self.votes.ravel()[flat[order]]
+        again = np.flatnonzero(flat[order][1:] == flat[order][:-1]) + 1
+        ordered[again] = votes[order[again - 1]]
+        replaced = np.empty_like(ordered)
+        replaced[order] = ordered
+        # keep the last vote per slot, as successive judge() calls would
+        _, last = np.unique(flat[::-1], return_index=True)
+        keep = len(flat) - 1 - last
+        flat, votes = flat[keep], votes[keep]
+        cells = flat // self.shape[2]
+        previous = self.votes.ravel()[flat].astype(np.int64)
+        had = previous != NO_VOTE
+        previous[~had] = 0
+        self.count += self._cell_totals(cells, 1 - had)
+        self.sum += self._cell_totals(cells, votes - previous)
+        self.sum_sq += self._cell_totals(cells, votes ** 2 - previous ** 2)
+        self.votes.ravel()[flat] = votes
+        for listener in self.listeners:
+            listener.rebuild()
+        return replaced
+
+    def _cell_totals(self, cells, values):
+        totals = np.bincount(cells, weights=values, minlength=self.count.size)
+        return totals.astype(np.int64).reshape(self.count.shape)
+
+    def free_jury(self, player: int, judgement: int):
+        free = np.flatnonzero(self.votes[player, judgement] == NO_VOTE)
+        if not len(free):
+            raise RuntimeError
+        return int(free[0])
+
+    def has_vote(self, player: int, judgement: int, jury: int):
+        return int(self.votes[player, judgement, jury]) != NO_VOTE
+
+    @property
+    def voted(self):
+        return self.votes != NO_VOTE
+
+    def all_voted(self, player: int, judgement: int):
+        return int(self.count[player, judgement]) == self.shape[2]
+
+    def cell_mean(self, player: int, judgement: int):
+        count = int(self.count[player, judgement])
+        return int(self.sum[player, judgement]) / count if count else 0.
+
+    def cell_variance(self, player: int, judgement: int):
+        count = int(self.count[player, judgement])
+        if not count:
+            return 0.
+        mean = int(self.sum[player, judgement]) / count
+        return int(self.sum_sq[player, judgement]) / count - mean * mean
+
+    def cell_means(self):
+        return np.divide(
+            self.sum, self.count, out=np.zeros(self.count.shape),
+            where=self.count > 0
+        )
+
+    def cell_variances(self):
+        means = self.cell_means()
+        return np.divide(
+            self.sum_sq, self.count, out=np.zeros(self.count.shape),
+            where=self.count > 0
+        ) - means * means
+
+    def finals(self):
+        return self.cell_means().mean(axis=1)
+
+    def ranking(self):
+        return np.argsort(-self.finals(), kind="stable")
@@ -0,0 +1,82 @@
+from array import array
+from collections import namedtuple
+
+PREP = "prep"
+VOTE = "vote"
+ROUND = "round"
+SUMMARY = "summary"
+END = "end"
+
+Step = namedtuple("Step", ["kind", "jury", "player", "judgement"])
+
+
+class TurnPlan:
+    # The play order of a whole game as ids: judgement t is played t-th and
+    # rates the players in order(t), the jurors vote in id order. Orders are
+    # drawn from the game's generator in turn order, the first time a turn
+    # is reached, so that starting a game does not pay for all of them.
+    def __init__(self, rng, player_number, judgement_number, jury_number,
+                 start=0, first=None):
+        self.rng = rng
+        self.player_number = player_number
+        self.judgement_number = judgement_number
+        self.jury_number = jury_number
+        # a row of player ids per judgement, the turns before start are
+        # already played and start is played in the `first` order
+        self.orders = array("I")
+        ids = range(player_number)
+        for _ in range(start):
+            self.orders.extend(ids)
+        self.orders.extend(ids if first is None else first)
+
+    def order(self, turn):
+        size = self.player_number
+        while len(self.orders) < (turn + 1) * size:
+            order = list(range(size))
+            self.rng.shuffle(order)
+            self.orders.extend(order)
+        return self.orders[turn * size:(turn + 1) * size]
+
+    def __len__(self):
+        return self.judgement_number * self.player_number * self.jury_number
+
+    def __iter__(self):
+        for turn in range(self.judgement_number):
+            for player in self.order(turn):
+                for jury in range(self.jury_number):
+                    yield turn, player, jury
+
+
+class TurnSequencer:
+    def __init__(self, game, parallel=False):
+        self.game = game
+        # in parallel rounds every juror votes at once from their own device
+        self.parallel = parallel
+        self._steps = self._iter_steps()
+
+    def _iter_steps(self):
+        game = self.game
+        plan = game.plan
+        jurors = [game.jury.name(i) for i in range(plan.jury_number)]
+        # Steps already voted, e.g. in a game recovered from its journal,
+        # are skipped.
+        for turn in range(game.turn, plan.judgement_number):
+            judgement = game.judgements.name(turn)
+            for player in map(game.players.name, plan.order(turn)):
+                if game.turn_complete(player, judgement):
+                    continue
+                if self.parallel:
+                    yield Step(ROUND, None, player, judgement)
+                    yield Step(SUMMARY, None, player, judgement)
+                    continue
+                for jury in jurors:
+                    if game.has_voted(player, judgement, jury):
+                        continue
+                    yield Step(PREP, jury, player, judgement)
+                    yield Step(VOTE, jury, player, judgement)
+                yield Step(SUMMARY, None, player, judgement)
+            game.finish_turn()
+        yield Step(END, None, None, None)
+
+    def next_step(self):
+        return next(self._steps, None)
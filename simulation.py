@@ -0,0 +1,211 @@
+import argparse
+import json
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from game import Game
+
+JURY_CHUNK = 256
+
+
+class JuryModel:
+    def __init__(self, noise=1.):
+        self.noise = noise
+
+    def bias(self, rng, quality, jury, player):
+        return 0.
+
+    def votes(self, rng, quality, jury, player=None):
+        noise = rng.normal(0., self.noise, quality.shape)
+        return quality + noise + self.bias(rng, quality, jury, player)
+
+
+class Fair(JuryModel):
+    pass
+
+
+class Lenient(JuryModel):
+    def __init__(self, noise=1., offset=2.):
+        super().__init__(noise)
+        self.offset = offset
+
+    def bias(self, rng, quality, jury, player):
+        return self.offset
+
+
+class Harsh(Lenient):
+    def __init__(self, noise=1., offset=-2.):
+        super().__init__(noise, offset)
+
+
+class Random(JuryModel):
+    def votes(self, rng, quality, jury, player=None):
+        return rng.integers(0, 11, quality.shape).astype(float)
+
+
+class Favoritism(JuryModel):
+    def __init__(self, noise=1., bonus=3., friends=.1):
+        super().__init__(noise)
+        self.bonus = bonus
+        self.friends = friends
+
+    def bias(self, rng, quality, jury, player):
+        friends = rng.random(quality.shape[0]) < self.friends
+        return np.where(friends, self.bonus, 0.)[:, None]
+
+
+class SelfServing(JuryModel):
+    def votes(self, rng, quality, jury, player=None):
+        votes = super().votes(rng, quality, jury, player)
+        if player is not None:
+            votes[player] = 10.
+        return votes
+
+
+jury_models = {
+    "fair": Fair,
+    "lenient": Lenient,
+    "harsh": Harsh,
+    "random": Random,
+    "favoritism": Favoritism,
+    "self": SelfServing,
+}
+
+
+def parse_model(spec: str):
+    # "name[:weight]"
+    name, _, weight = spec.partition(":")
+    if name not in jury_models:
+        raise ValueError(f"unknown jury model {name!r}")
+    return name, float(weight) if weight else 1.
+
+
+def make_game(player_number, jury_number, judgement_number,
+              jury_are_players=True, rng=None):
+    players = [f"P{i}" for i in range(player_number)]
+    jury = [f"J{i}" for i in range(jury_number)]
+    if jury_are_players:
+        shared = min(player_number, jury_number)
+        jury[:shared] = players[:shared]
+    judgements = [f"T{i}" for i in range(judgement_number)]
+    return Game(players=players, jury=jury, judgements=judgements, rng=rng)
+
+
+def simulate_game(index, seed, player_number, jury_number, judgement_number,
+                  models, jury_are_players=True):
+    start = time.perf_counter()
+    sequence = np.random.SeedSequence(entropy=seed, spawn_key=(index,))
+    rng = np.random.default_rng(sequence)
+    # the game draws its orders from a stream of its own, independent of the
+    # votes and of the other games
+    game = make_game(
+        player_number, jury_number, judgement_number, jury_are_players,
+        rng=np.random.default_rng(sequence.spawn(1)[0])
+    )
+    game.set()
+    board = game.board
+    quality = rng.uniform(2., 8., (player_number, judgement_number))
+    names = [name for name, _ in models]
+    weights = np.array([weight for _, weight in models])
+    picks = rng.choice(len(names), jury_number, p=weights / weights.sum())
+    instances = {name: jury_models[name]() for name in set(names)}
+
+    player_ids = [board.player_ids[f"P{i}"] for i in range(player_number)]
+    judgement_ids = [
+        board.judgement_ids[f"T{i}"] for i in range(judgement_number)
+    ]
+    p_index, t_index = np.meshgrid(
+        player_ids, judgement_ids, indexing="ij"
+    )
+    p_index, t_index = p_index.ravel(), t_index.ravel()
+    jury_names = list(board.jury_ids)
+    for chunk in range(0, jury_number, JURY_CHUNK):
+        chunk_ids = range(chunk, min(chunk + JURY_CHUNK, jury_number))
+        votes = np.empty((len(chunk_ids), len(p_index)), dtype=np.int64)
+        for row, jury_id in enumerate(chunk_ids):
+            jury = jury_names[jury_id]
+            model = instances[names[picks[jury_id]]]
+            player = int(jury[1:]) if jury.startswith("P") else None
+            votes[row] = np.clip(
+                np.rint(model.votes(rng, quality, jury_id, player)), 0, 10
+            ).ravel()
+        board.judge_many(
+            np.tile(p_index, len(chunk_ids)),
+            np.tile(t_index, len(chunk_ids)),
+            np.repeat(np.array(chunk_ids), len(p_index)),
+            votes.ravel()
+        )
+
+    finals = board.finals()[player_ids]
+    truth = quality.mean(axis=1)
+    return {
+        "game": index,
+        "players": player_number,
+        "jury": jury_number,
+        "judgements": judgement_number,
+        "spearman": round(spearman(truth, finals), 4),
+        "top_hit": bool(np.argmax(truth) == np.argmax(finals)),
+        "mae": round(float(np.abs(finals - truth).mean()), 4),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def spearman(a, b):
+    rank_a = np.argsort(np.argsort(a))
+    rank_b = np.argsort(np.argsort(b))
+    if len(a) < 2:
+        return 1.
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def _simulate(args):
+    return simulate_game(*args)
+
+
+def simulate(games, seed, player_number, jury_number, judgement_number,
+             models, jury_are_players=True, processes=None, chunksize=4):
+    tasks = (
+        (i, seed, player_number, jury_number, judgement_number, models,
+         jury_are_players)
+        for i in range(games)
+    )
+    if processes == 1:
+        yield from map(_simulate, tasks)
+        return
+    with Pool(processes) as pool:
+        yield from pool.imap_unordered(_simulate, tasks, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate bias phone games without the app."
+    )
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=15)
+    parser.add_argument("--jury", type=int, default=12)
+    parser.add_argument("--judgements", type=int, default=6)
+    parser.add_argument(
+        "--model", action="append", type=parse_model, dest="models",
+        help=f"jury model and weight, e.g. harsh:0.2 "
+             f"({', '.join(jury_models)})"
+    )
+    parser.add_argument("--external-jury", action="store_true",
+                        help="jurors are not players")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    results = simulate(
+        args.games, args.seed, args.players, args.jury, args.judgements,
+        args.models or [("fair", 1.)], not args.external_jury,
+        args.processes
+    )
+    for result in results:
+        sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import concurrent.futures
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+WORKERS = 2
+
+
+class Task:
+    # A job handed to a TaskRunner. Its callbacks run on the main loop, and
+    # never once it is cancelled.
+    def __init__(self, key=None):
+        self.key = key
+        self.cancelled = False
+        self.done = False
+        self._future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self._future is not None:
+            # only stops a job still queued, a running one is dropped when
+            # it ends
+            self._future.cancel()
+
+
+class TaskRunner:
+    # Runs work off the Kivy main loop and hands its results back to it
+    # through the Clock. Jobs run on a thread pool, numpy releases the GIL
+    # in its heavy loops, pure Python CPU bound jobs can ask for a process
+    # pool. Tasks given the same key coalesce: a new one cancels the one
+    # before, so a screen asking again only gets the latest result.
+    # Called from the main loop only.
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._threads = None
+        self._processes = None
+        self._latest = dict()  # key -> Task
+
+    @property
+    def threads(self):
+        if self._threads is None:
+            self._threads = concurrent.futures.ThreadPoolExecutor(
+                self.workers, thread_name_prefix="task"
+            )
+        return self._threads
+
+    @property
+    def processes(self):
+        if self._processes is None:
+            self._processes = concurrent.futures.ProcessPoolExecutor(
+                self.workers
+            )
+        return self._processes
+
+    def _new_task(self, key):
+        task = Task(key)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = task
+        return task
+
+    def submit(self, function, *args, on_result=None, on_error=None,
+               key=None, process=False, delay=0) -> Task:
+        # function(*args) in a worker, on_result(result) on the main loop;
+        # a process job must be picklable, a delay in seconds leaves the
+        # next frames to the main loop
+        task = self._new_task(key)
+        self._start(task, function, args, on_result, on_error, process, delay)
+        return task
+
+    def stream(self, function, *args, on_item=None, on_result=None,
+               on_error=None, key=None, delay=0) -> Task:
+        # for generators: every item is passed to on_item on the main loop
+        # as soon as it is produced, the worker stops at the next item once
+        # the task is cancelled
+        task = self._new_task(key)
+
+        def run():
+            for item in function(*args):
+                if task.cancelled:
+                    return
+                if on_item is not None:
+                    Clock.schedule_once(
+                        lambda _, item=item: self._deliver(task, on_item, item)
+                    )
+
+        self._start(task, run, (), on_result, on_error, False, delay)
+        return task
+
+    def _start(self, task, function, args, on_result, on_error, process,
+               delay):
+        executor = self.processes if process else self.threads
+
+        def start(_=None):
+            if task.cancelled:
+                self._forget(task)
+                return
+            task._future = executor.submit(function, *args)
+            task._future.add_done_callback(
+                lambda future: Clock.schedule_once(
+                    lambda _: self._finish(task, future, on_result, on_error)
+                )
+            )
+
+        if delay:
+            Clock.schedule_once(start, delay)
+        else:
+            start()
+
+    def cancel(self, key):
+        task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def _forget(self, task):
+        if self._latest.get(task.key) is task:
+            del self._latest[task.key]
+
+    @staticmethod
+    def _deliver(task, callback, value):
+        if not task.cancelled:
+            callback(value)
+
+    def _finish(self, task, future, on_result, on_error):
+        self._forget(task)
+        task.done = True
+        if task.cancelled or future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if on_result is not None:
+                on_result(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            Logger.error("Tasks: %s failed", task.key or "a task",
+                         exc_info=error)
+
+    def shutdown(self):
+        for task in list(self._latest.values()):
+            task.cancel()
+        self._latest.clear()
+        for executor in (self._threads, self._processes):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+tasks = TaskRunner()
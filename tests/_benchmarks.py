@@ -0,0 +1,445 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_WINDOW", "sdl2")
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+# frames only measure work, not the wait for the next vsync
+os.environ.setdefault("KCFG_GRAPHICS_MAXFPS", "0")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game import Game
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "benchmark_baseline.json")
+# a timing is a regression when it is this much slower than the baseline
+TOLERANCE = 1.5
+# and when it is at least this much slower, as tiny timings are noisy, in
+# the unit of each metric
+NOISE = {"us": 1.0, "ms": 2.0, "kib": 128.0}
+# each benchmark is run this many times, the median of each metric is kept
+REPEAT = 5
+# worst cases are a single sample, they are shown but never gated; the
+# worst handler calls have the frame budget instead
+UNGATED = ("_max", "_p95")
+UNGATED_BENCHMARKS = ("handlers",)
+SIZES = [(15, 12, 6), (60, 40, 10), (200, 100, 10)]
+# no handler of main.py may block the main loop for longer than a frame,
+# whatever the baseline, see tests/test_handlers.py
+HANDLER_BUDGET_MS = 1000 / 60
+
+benchmarks = dict()
+
+
+def benchmark(function):
+    benchmarks[function.__name__] = function
+    return function
+
+
+def make_game(players, jury, judgements):
+    return Game(
+        players=[f"P{i}" for i in range(players)],
+        jury=[f"J{i}" for i in range(jury)],
+        judgements=[f"T{i}" for i in range(judgements)],
+        seed=0,
+    )
+
+
+def best_of(function, repeat=9):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@benchmark
+def game_engine():
+    results = dict()
+    for players, jury, judgements in SIZES:
+        game = make_game(players, jury, judgements)
+        game.set()
+        calls = [(p, t, j) for t in game.judgements for p in game.players
+                 for j in game.jury]
+        start = time.perf_counter()
+        for p, t, j in calls:
+            game.judge(p, t, 5, j)
+        judge = (time.perf_counter() - start) / len(calls)
+        cells = [(p, t) for t in game.judgements for p in game.players]
+        # the first call imports and attaches the aggregator
+        game.summarize_turn(*cells[0])
+        start = time.perf_counter()
+        for p, t in cells:
+            game.summarize_turn(p, t)
+        summarize = (time.perf_counter() - start) / len(cells)
+        finish = best_of(game.finish_game)
+        key = f"{players}x{jury}x{judgements}"
+        results[f"judge_us_{key}"] = judge * 1e6
+        results[f"summarize_us_{key}"] = summarize * 1e6
+        results[f"finish_game_ms_{key}"] = finish * 1e3
+    return results
+
+
+def app_screen_manager(**kwargs):
+    from kivy.core.window import Window
+    from kivy.uix.screenmanager import NoTransition
+    from main import BiasScreenManager
+    screen_manager = BiasScreenManager(**kwargs)
+    screen_manager.transition = NoTransition()
+    Window.add_widget(screen_manager)
+    return screen_manager, Window
+
+
+@benchmark
+def init_game():
+    results = dict()
+    screen_manager, window = app_screen_manager()
+    # the first game builds the screen pool, which is not measured here
+    screen_manager.init_game()
+    screen_manager.switch_to_menu()
+    for players, jury, judgements in SIZES:
+        screen_manager.game = make_game(players, jury, judgements)
+        for screen in (screen_manager.prep_screen,
+                       screen_manager.voting_screen,
+                       screen_manager.summary_screen,
+                       screen_manager.end_screen):
+            if screen is not None:
+                screen.game = screen_manager.game
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        screen_manager.init_game()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        screen_manager.switch_to_menu()
+        key = f"{players}x{jury}x{judgements}"
+        results[f"init_game_ms_{key}"] = elapsed * 1e3
+        results[f"init_game_peak_kib_{key}"] = peak / 1024
+    window.remove_widget(screen_manager)
+    return results
+
+
+@benchmark
+def roster_redraw():
+    from kivy.clock import Clock
+    results = dict()
+    screen_manager, window = app_screen_manager()
+    screen_manager.switch_to_game()
+    screen = screen_manager.game_screen
+    for size in (60, 300):
+        for player in list(screen_manager.game.players):
+            screen.remove_player(player)
+        for i in range(size):
+            screen_manager.game.add_player(f"P{i}")
+            screen_manager.game.add_jury(f"P{i}")
+
+        def redraw():
+            screen.display_players()
+            screen.roster_view.settle()
+            Clock.tick()
+        results[f"redraw_ms_{size}"] = best_of(redraw) * 1e3
+
+        def toggle():
+            screen.toggle_presence(None, size // 2)
+            Clock.tick()
+        results[f"toggle_ms_{size}"] = best_of(toggle) * 1e3
+    window.remove_widget(screen_manager)
+    return results
+
+
+@benchmark
+def screen_transitions():
+    from kivy.base import EventLoop
+    from kivy.core.window import Window
+    from kivy.uix.screenmanager import SlideTransition
+    from main import BiasScreenManager, VotingScreen
+    EventLoop.ensure_window()
+    screen_manager = BiasScreenManager()
+    screen_manager.transition = SlideTransition(duration=.1)
+    Window.add_widget(screen_manager)
+    screen_manager.switch_to_game()
+    # the first frames create the window and its textures
+    for _ in range(30):
+        EventLoop.idle()
+    screen_manager.init_game()
+    from kivy.clock import Clock
+    work = list()
+    frames = list()
+
+    def frame():
+        # the same steps as EventLoop.idle, the draw itself is timed apart
+        # as the headless GL driver renders in software
+        start = time.perf_counter()
+        Clock.tick()
+        EventLoop.dispatch_input()
+        Clock.tick_draw()
+        work.append(time.perf_counter() - start)
+        Window.dispatch("on_draw")
+        Window.dispatch("on_flip")
+        frames.append(time.perf_counter() - start)
+
+    while screen_manager.current != "endscreen":
+        for _ in range(8):
+            frame()
+        screen = screen_manager.current_screen
+        if isinstance(screen, VotingScreen):
+            screen.vote(5)
+        else:
+            screen.switch_to_next()
+    for _ in range(8):
+        frame()
+    screen_manager.switch_to_menu()
+    Window.remove_widget(screen_manager)
+    work.sort()
+    frames.sort()
+    return {
+        "work_ms_median": statistics.median(work) * 1e3,
+        "work_ms_p95": work[int(len(work) * .95)] * 1e3,
+        "work_ms_max": work[-1] * 1e3,
+        "frame_ms_median": statistics.median(frames) * 1e3,
+        "frame_ms_p95": frames[int(len(frames) * .95)] * 1e3,
+    }
+
+
+def _write_catalog(path, players, jury, judgements, names=5000):
+    # a catalog of past games: many names to suggest from, and the roster
+    # of the game to play as the latest preset
+    from catalog import Catalog, PLAYERS
+    catalog = Catalog(path)
+    catalog.remember(PLAYERS, [f"Ancien {i}" for i in range(names)])
+    catalog.record_game(players, jury, judgements)
+    catalog.save()
+
+
+@benchmark
+def handlers():
+    # The worst call of each button handler over a large game played as in
+    # the app, with its journal, history, exports and catalog. The roster
+    # and judgement screens are used first, the roster coming from a
+    # preset, then the join screen against a local server. The votes of
+    # all judgements but the last are cast up front, the last one is played
+    # through the screens, then every end screen button is pressed. Frames
+    # run between calls, garbage collections are kept out of the timings.
+    from kivy.base import EventLoop
+    from kivy.clock import Clock
+    from main import VotingScreen
+    from network import VoteServer
+    players, jury, judgements = 200, 10, 3
+    names = [f"P{i}" for i in range(players)]
+    directory = tempfile.mkdtemp()
+    catalog_path = os.path.join(directory, "catalog.json")
+    _write_catalog(catalog_path, names, names[:jury],
+                   [f"T{i}" for i in range(judgements)])
+    screen_manager, window = app_screen_manager(
+        journal_path=os.path.join(directory, "journal.bin"),
+        history_path=os.path.join(directory, "history.db"),
+        export_dir=os.path.join(directory, "exports"),
+        catalog_path=catalog_path,
+    )
+    game = Game(judgements=[f"T{i}" for i in range(judgements)], seed=0)
+    screen_manager.game = game
+    for _ in screen_manager.prebuild():
+        pass
+    worst = dict()
+
+    def timed(name, handler, *args):
+        start = time.perf_counter()
+        handler(*args)
+        elapsed = (time.perf_counter() - start) * 1e3
+        worst[name] = max(worst.get(name, 0.), elapsed)
+
+    def frames(count=8):
+        for _ in range(count):
+            EventLoop.idle()
+
+    gc.collect()
+    gc.disable()
+    try:
+        game_screen = screen_manager.game_screen
+        timed("open_game_init", screen_manager.switch_to_game)
+        frames()
+        timed("preset", game_screen.presets.choose, 0)
+        frames()
+        for text in ("A", "An", "Anc"):
+            timed("type_player", setattr, game_screen.new_player, "text",
+                  text)
+        timed("suggestion", game_screen.suggestions.choose, 0)
+        game_screen.new_player.text = "Nouveau"
+        timed("add_player", game_screen.add_player_to_game)
+        frames()
+        index = len(game_screen.roster_view.data) - 1
+        timed("presence", game_screen.toggle_presence, None, index)
+        timed("presence", game_screen.toggle_presence, None, index)
+        for _ in range(2):
+            timed("remove_player", game_screen.remove_player_row, None,
+                  len(game_screen.roster_view.data) - 1)
+        frames()
+        judgement_screen = screen_manager.judgement_settings
+        timed("open_judgements", screen_manager.switch_to_judgements_settings)
+        frames()
+        timed("type_judgement", setattr, judgement_screen.new_judgement,
+              "text", "Nouveau")
+        timed("add_judgement", judgement_screen.add_judgement_to_game)
+        timed("remove_judgement", judgement_screen.remove_judgement_row,
+              None, len(judgement_screen.roster_view.data) - 1)
+        timed("judgements_back", judgement_screen.back_button.dispatch,
+              "on_press")
+        frames()
+
+        join_screen = screen_manager.join_screen
+        server = VoteServer(game, "127.0.0.1")
+        try:
+            server.start()
+        except OSError:
+            # the port is taken, the join screen is pressed without a host
+            server = None
+        timed("open_join", screen_manager.switch_to_join)
+        join_screen.host.text = "127.0.0.1"
+        join_screen.jury.text = names[0]
+        if server is not None:
+            server.open_turn(names[1], "T0")
+        timed("join", join_screen.join_button.dispatch, "on_press")
+        deadline = time.perf_counter() + 2
+        while join_screen.vote_buttons[0].disabled and \
+                time.perf_counter() < deadline:
+            Clock.tick()
+        if not join_screen.vote_buttons[0].disabled:
+            timed("join_vote", join_screen.vote, 5)
+        timed("join_back", join_screen.back_button.dispatch, "on_press")
+        frames()
+        if server is not None:
+            server.stop()
+
+        timed("open_game_init", screen_manager.switch_to_game)
+        frames()
+        timed("init_game", game_screen.start_button.dispatch, "on_press")
+        board = game.board
+        cast = [(p, t, j) for t in range(judgements - 1)
+                for p in range(players) for j in range(jury)]
+        game.judge_many(*zip(*[(p, t, 5, j) for p, t, j in cast]))
+        calls = 0
+        while screen_manager.current != "endscreen":
+            screen = screen_manager.current_screen
+            if isinstance(screen, VotingScreen):
+                timed("vote", screen.vote, 5)
+            else:
+                timed(f"{screen.name}_next", screen.switch_to_next)
+            calls += 1
+            if calls % 8 == 0:
+                EventLoop.idle()
+            if calls % 1000 == 0:
+                gc.collect()
+        end_screen = screen_manager.end_screen
+        frames()
+        for aggregation, button in end_screen.aggregation_buttons.items():
+            timed(f"aggregation_{aggregation}", button.dispatch, "on_press")
+        for judgement in board.judgement_ids:
+            timed("board", setattr, end_screen.board_spinner, "text",
+                  judgement)
+        timed("export", end_screen.export_button.dispatch, "on_press")
+        timed("back", end_screen.ok_button.dispatch, "on_press")
+    finally:
+        gc.enable()
+    screen_manager.history.close()
+    game.journal.close()
+    window.remove_widget(screen_manager)
+    return {f"{name}_ms": elapsed for name, elapsed in worst.items()}
+
+
+def over_budget(results):
+    over = [f"handlers.{metric}" for metric, value
+            in results.get("handlers", {}).items()
+            if value > HANDLER_BUDGET_MS]
+    for metric in over:
+        print(f"{metric}: over the {HANDLER_BUDGET_MS:.1f} ms frame budget")
+    return over
+
+
+def run(name, repeat=REPEAT):
+    # the median of each metric over repeated runs
+    runs = [benchmarks[name]() for _ in range(repeat)]
+    return {metric: statistics.median(result[metric] for result in runs)
+            for metric in runs[0]}
+
+
+def noise(metric):
+    # the floor of the metric's unit, named in the metric: judge_us_...
+    for unit in metric.split("_"):
+        if unit in NOISE:
+            return NOISE[unit]
+    return 0.
+
+
+def gated(name, metric):
+    return name not in UNGATED_BENCHMARKS and not metric.endswith(UNGATED)
+
+
+def compare(results, baseline):
+    regressions = list()
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if reference is None:
+                continue
+            ratio = value / reference if reference else 1.
+            flag = ""
+            if not gated(name, metric):
+                flag = "  (not gated)"
+            elif ratio > TOLERANCE and value - reference > noise(metric):
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(f"{name}.{metric}: {value:.3f} "
+                  f"(baseline {reference:.3f}, x{ratio:.2f}){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless performance benchmarks."
+    )
+    parser.add_argument("names", nargs="*", choices=[[]] + list(benchmarks),
+                        help="benchmarks to run, all by default")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="runs of each benchmark, medians are kept")
+    args = parser.parse_args(argv)
+
+    results = {name: run(name, args.repeat)
+               for name in args.names or benchmarks}
+    if over_budget(results):
+        return 1
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write("\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return 0
+    with open(args.baseline) as baseline:
+        regressions = compare(results, json.load(baseline))
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import gc
+import os
+import sys
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from kivy.uix.screenmanager import NoTransition
+from kivy.uix.widget import Widget
+
+from main import BiasScreenManager, VotingScreen
+
+GAMES = 100
+WARMUP = 5
+MAX_RSS_GROWTH = 5 * 1024 * 1024
+
+
+def rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def widget_count():
+    gc.collect()
+    # type() does not dereference the weak proxies Kivy leaves around
+    return sum(issubclass(type(o), Widget) for o in gc.get_objects())
+
+
+def play(screen_manager):
+    screen_manager.switch_to_game()
+    screen_manager.init_game()
+    while screen_manager.current != "endscreen":
+        screen = screen_manager.current_screen
+        if isinstance(screen, VotingScreen):
+            screen.vote(5)
+        else:
+            screen.switch_to_next()
+    screen_manager.end_screen.ok_button.on_press()
+
+
+if __name__ == '__main__':
+    sm = BiasScreenManager()
+    sm.transition = NoTransition()
+    for _ in range(WARMUP):
+        play(sm)
+    widgets, memory = widget_count(), rss()
+    for _ in range(GAMES):
+        play(sm)
+    widgets_after, memory_after = widget_count(), rss()
+    print(f"widgets: {widgets} -> {widgets_after}")
+    print(f"rss: {memory / 2 ** 20:.1f} MiB -> "
+          f"{memory_after / 2 ** 20:.1f} MiB")
+    if widgets_after != widgets or memory_after - memory > MAX_RSS_GROWTH:
+        sys.exit(1)
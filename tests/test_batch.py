@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from batch import read_sessions
+
+HEADER = "player,judgement,jury,vote\n"
+
+
+def _error(text):
+    try:
+        list(read_sessions(io.StringIO(text)))
+    except ValueError as error:
+        return str(error)
+    return None
+
+
+def test_ragged_rows_are_rejected():
+    # 5 + 3 fields add up to two rows, the columns must not shift
+    assert _error(HEADER + "a,x,a,5,b\nx,b,6\n") == \
+        "line 2: 5 fields instead of 4"
+
+
+def test_ragged_rows_are_rejected_as_with_quotes():
+    # the quoted block goes through the csv module, the same error
+    assert _error(HEADER + '"a",x,a,5,b\nx,b,6\n') == \
+        _error(HEADER + "a,x,a,5,b\nx,b,6\n")
+
+
+def test_rows_are_read():
+    session, = read_sessions(io.StringIO(HEADER + "a,x,b,5\nb,x,a,6\n"))
+    assert list(session.players) == ["a", "b"]
+    assert [vote.score for vote in session.log] == [5, 6]
+
+
+def test_many_small_sessions_are_read_in_linear_time():
+    # one scan per chunk: 60k sessions of 4 rows read like 3 big ones
+    lines = ["session," + HEADER]
+    for session in range(60000):
+        lines += [f"s{session},a,x,b,5\n", f"s{session},b,x,a,6\n",
+                  f"s{session},a,y,b,7\n", f"s{session},b,y,a,8\n"]
+    start = time.perf_counter()
+    sessions = list(read_sessions(io.StringIO("".join(lines))))
+    elapsed = time.perf_counter() - start
+    assert len(sessions) == 60000
+    assert [vote.score for vote in sessions[-1].log] == [5, 6, 7, 8]
+    assert elapsed < 20, f"{elapsed:.1f} s to read 240k rows"
+
+
+def test_split_sessions_are_rejected():
+    error = _error("session," + HEADER + "s1,a,x,b,5\ns2,a,x,b,5\n"
+                   "s1,b,x,a,6\n")
+    assert error.startswith("line 4: session 's1' is split")
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _benchmarks import HANDLER_BUDGET_MS, run
+
+
+def test_no_handler_blocks_a_frame():
+    # the worst call of each handler, the median over a few games so that a
+    # single descheduling does not fail the test
+    results = run("handlers", 3)
+    over = {metric: round(value, 1) for metric, value in results.items()
+            if value > HANDLER_BUDGET_MS}
+    assert not over, f"over the {HANDLER_BUDGET_MS:.1f} ms frame: {over}"
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
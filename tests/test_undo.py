@@ -0,0 +1,162 @@
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import numpy as np
+
+from game import Game
+from journal import Journal, recover
+from scoring import NO_VOTE
+
+
+def _game(players=6, jury=4, judgements=5, journal=None):
+    game = Game(
+        players=[f"P{i}" for i in range(players)],
+        jury=[f"J{i}" for i in range(jury)],
+        judgements=[f"T{i}" for i in range(judgements)],
+        seed=0,
+    )
+    game.journal = journal
+    game.set()
+    return game
+
+
+def _replay(game, position):
+    # the votes once the first `position` events are applied to an empty
+    # board, one at a time
+    votes = np.full(game.board.shape, NO_VOTE, dtype=np.int8)
+    for event in list(game.log)[:position]:
+        votes[event.player, event.judgement, event.jury] = event.vote
+    return votes
+
+
+def _check_board(game):
+    board = game.board
+    assert np.array_equal(board.votes, _replay(game, game.log.position))
+    voted = board.votes != NO_VOTE
+    assert np.array_equal(board.count, voted.sum(axis=2))
+    assert np.array_equal(board.sum,
+                          np.where(voted, board.votes, 0).sum(axis=2))
+
+
+def _play(game, steps, rng):
+    # votes, amendments, undos and redos at random, the board is checked
+    # against a replay of the log after each
+    shape = game.board.shape
+    for _ in range(steps):
+        action = rng.random()
+        if action < .5:
+            slot = [rng.randrange(size) for size in shape]
+            game.judge(slot[0], slot[1], rng.randrange(11), slot[2])
+        elif action < .6 and game.log.position:
+            event = game.log[game.log.position - 1]
+            if game.board.votes[event.player, event.judgement,
+                                event.jury] != NO_VOTE:
+                game.amend(event.player, event.judgement, event.jury,
+                           rng.randrange(11))
+        elif action < .85:
+            game.undo()
+        else:
+            game.redo()
+        _check_board(game)
+
+
+def test_undo_and_redo_follow_the_log():
+    game = _game()
+    _play(game, 600, random.Random(1))
+
+
+def test_undo_back_to_the_start_and_redo_to_the_end():
+    game = _game()
+    _play(game, 300, random.Random(2))
+    end = len(game.log)
+    while game.redo() is not None:
+        pass
+    final = game.board.votes.copy()
+    while game.undo() is not None:
+        _check_board(game)
+    assert game.log.position == 0
+    assert (game.board.votes == NO_VOTE).all()
+    while game.redo() is not None:
+        pass
+    assert game.log.position == end
+    assert np.array_equal(game.board.votes, final)
+
+
+def test_a_vote_after_an_undo_drops_the_undone_events():
+    game = _game()
+    game.judge(0, 0, 3, 0)
+    game.judge(0, 0, 4, 1)
+    game.undo()
+    game.judge(1, 0, 5, 0)
+    assert len(game.log) == 2
+    assert game.redo() is None
+    _check_board(game)
+
+
+def test_votes_at_matches_a_replay():
+    # past the log spacing, so that the votes are rebuilt from the copies
+    # kept either side
+    game = _game()
+    _play(game, 2000, random.Random(3))
+    log = game.log
+    assert len(log) > 2 * log.spacing
+    positions = {0, len(log), log.position}
+    positions.update(random.Random(4).sample(range(len(log) + 1), 50))
+    for position in sorted(positions):
+        assert np.array_equal(log.votes_at(position),
+                              _replay(game, position)), position
+
+
+def test_recovery_from_a_snapshot_keeps_the_board_and_the_undo():
+    path = os.path.join(tempfile.mkdtemp(), "journal.bin")
+    journal = Journal(path, snapshot_every=16)
+    game = _game(journal=journal)
+    rng = random.Random(5)
+    for turn, judgement in enumerate(list(game.judgements)[:3]):
+        for player in list(game.players):
+            for juror in game.jury:
+                game.judge(player, judgement, rng.randrange(11), juror)
+            if rng.random() < .3:
+                game.undo()
+        if turn < 2:
+            game.finish_turn()
+    journal.flush()
+    recovered = recover(path)
+    assert np.array_equal(recovered.board.votes, game.board.votes)
+    assert recovered.log.position <= len(recovered.log)
+    # the votes of the judgement being played can be taken back after a
+    # relaunch, as before it
+    for _ in range(5):
+        expected, got = game.undo(), recovered.undo()
+        assert tuple(got) == tuple(expected)
+        assert np.array_equal(recovered.board.votes, game.board.votes)
+    journal.close()
+
+
+def test_snapshots_do_not_grow_with_the_game():
+    path = os.path.join(tempfile.mkdtemp(), "journal.bin")
+    journal = Journal(path, snapshot_every=64)
+    game = _game(players=10, jury=10, judgements=8, journal=journal)
+    sizes = list()
+    for judgement in list(game.judgements):
+        for player in list(game.players):
+            for juror in game.jury:
+                game.judge(player, judgement, 5, juror)
+        journal.snapshot(game)
+        sizes.append(os.path.getsize(journal.snapshot_path))
+        game.finish_turn()
+    # the header alone changes, by a few digits
+    assert max(sizes) - min(sizes) < 64, sizes
+    journal.close()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+import numpy as np
+
+from scoring import NO_VOTE
+
+RESAMPLES = 2000
+CONFIDENCE = .95
+# floats held at once by a batch of resampled means or comparisons
+BATCH_ELEMENTS = 1 << 20
+
+# The bootstrap intervals of players start to stop - 1: `cells` is
+# (players, judgements, 2) low and high cell means, `finals` is (players, 2).
+Intervals = namedtuple("Intervals", ["start", "stop", "cells", "finals"])
+# ahead[a, b] is the probability that player a ends above player b, ties
+# counting half, a gap is significant when it reaches `confidence`.
+Pairwise = namedtuple("Pairwise", ["ahead", "confidence"])
+
+
+def juror_weights(rng, resamples, jury_number):
+    # how many times each juror is drawn in each resample, (resamples, jury)
+    return rng.multinomial(
+        jury_number, np.full(jury_number, 1 / jury_number), size=resamples
+    ).astype(np.float64)
+
+
+def bootstrap(votes, resamples=RESAMPLES, confidence=CONFIDENCE, seed=None):
+    # Bootstrap over jurors of the mean scores of a (players, judgements,
+    # jury) vote tensor. A resample draws the jury with replacement: a cell
+    # mean is then a weighted mean of its votes, so that all resamples of a
+    # batch of cells are two matrix products. Yields Intervals batches in
+    # player order, then the Pairwise probabilities, every resample shares
+    # the same jury draws.
+    player_number, judgement_number, jury_number = votes.shape
+    if not votes.size:
+        return
+    weights = juror_weights(
+        np.random.default_rng(seed), resamples, jury_number
+    ).T
+    voted = votes != NO_VOTE
+    values = np.where(voted, votes, 0).astype(np.float64)
+    counts = voted.astype(np.float64)
+    tails = [50 * (1 - confidence), 50 * (1 + confidence)]
+    finals = np.empty((player_number, resamples))
+    step = max(1, BATCH_ELEMENTS // (judgement_number * resamples))
+    for start in range(0, player_number, step):
+        stop = min(start + step, player_number)
+        sums = values[start:stop] @ weights
+        number = counts[start:stop] @ weights
+        # a resample without any vote in a cell keeps the observed mean
+        observed = _means(values[start:stop].sum(axis=2),
+                          counts[start:stop].sum(axis=2))
+        means = np.repeat(observed[..., None], resamples, axis=2)
+        np.divide(sums, number, out=means, where=number > 0)
+        finals[start:stop] = means.mean(axis=1)
+        yield Intervals(
+            start, stop,
+            np.moveaxis(np.percentile(means, tails, axis=2), 0, -1),
+            np.percentile(finals[start:stop], tails, axis=1).T,
+        )
+    yield Pairwise(ahead(finals), confidence)
+
+
+def _means(sums, counts):
+    return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+
+def ahead(finals):
+    # P(final a > final b) for every pair, from (players, resamples) finals
+    player_number, resamples = finals.shape
+    greater = np.empty((player_number, player_number), dtype=np.int64)
+    step = max(1, BATCH_ELEMENTS // (player_number * resamples))
+    for start in range(0, player_number, step):
+        greater[start:start + step] = np.count_nonzero(
+            finals[start:start + step, None, :] > finals, axis=2
+        )
+    # the resamples where neither is greater are ties: B - g[a, b] - g[b, a]
+    return (resamples + greater - greater.T) / (2 * resamples)
+
+
+if __name__ == '__main__':
+    import time
+
+    rng = np.random.default_rng(0)
+    for shape in ((15, 6, 12), (60, 10, 40), (200, 10, 100)):
+        votes = rng.integers(0, 11, shape, dtype=np.int8)
+        start = time.perf_counter()
+        batches = list(bootstrap(votes, seed=0))
+        elapsed = time.perf_counter() - start
+        print(f"{shape[0]} players, {shape[1]} judgements, {shape[2]} jury: "
+              f"{RESAMPLES} resamples in {elapsed * 1e3:.0f} ms, "
+              f"{len(batches) - 1} batches")
@@ -0,0 +1,173 @@
+from kivy.properties import BooleanProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from constants import SMALL_HEIGHT, SMALL_WIDTH
+from scheduler import scheduler, VISIBLE
+
+# Lists of any length for the roster, judgement and end screens, imported
+# when the first of them is built rather than at start-up.
+
+ROW_CHUNK = 20
+
+
+class RosterRow(RecycleDataViewBehavior, BoxLayout):
+    text = StringProperty("")
+    present = BooleanProperty(True)
+    show_presence = BooleanProperty(True)
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation="horizontal", **kwargs)
+        self.roster_view = None
+        self.index = None
+        self.label = Label(size_hint_y=None, height=SMALL_HEIGHT)
+        self.add_widget(self.label)
+        self.presence_button = Button(
+            size_hint_y=None, height=SMALL_HEIGHT, width=SMALL_WIDTH,
+            size_hint_x=None,
+            on_press=lambda _: self.roster_view.dispatch(
+                "on_toggle", self.index
+            )
+        )
+        self.on_present(self, self.present)
+        self.add_widget(self.presence_button)
+        self.add_widget(Button(
+            text="Supprimer", size_hint_y=None, height=SMALL_HEIGHT,
+            width=SMALL_WIDTH, size_hint_x=None,
+            on_press=lambda _: self.roster_view.dispatch(
+                "on_remove", self.index
+            )
+        ))
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.roster_view = rv
+        self.index = index
+        self.present = data.get("present", True)
+        self.show_presence = data.get("show_presence", True)
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_text(self, _, text):
+        self.label.text = text
+
+    def on_present(self, _, present):
+        self.presence_button.text = "Présent(e)" if present else "Absent(e)"
+
+    def on_show_presence(self, _, show):
+        if show and self.presence_button.parent is None:
+            self.add_widget(self.presence_button, index=1)
+        elif not show and self.presence_button.parent is not None:
+            self.remove_widget(self.presence_button)
+
+
+class RosterView(RecycleView):
+    # only the rows on screen exist as widgets, they are re-bound to the
+    # data as it scrolls or changes
+    __events__ = ("on_toggle", "on_remove")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        layout = RecycleBoxLayout(
+            orientation="vertical", spacing=10, size_hint_y=None,
+            default_size=(None, SMALL_HEIGHT), default_size_hint=(1, None)
+        )
+        # Make sure the height is such that there is something to scroll.
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.viewclass = RosterRow
+        self._fill_job = None
+
+    def fill(self, rows, priority=VISIBLE):
+        # rows are appended a chunk per step, over as many frames as needed
+        scheduler.cancel(self._fill_job)
+        self.data = list()
+        self._fill_job = scheduler.add(self._iter_fill(rows), priority)
+
+    def _iter_fill(self, rows):
+        chunk = list()
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == ROW_CHUNK:
+                self.data.extend(chunk)
+                chunk = list()
+                yield
+        self.data.extend(chunk)
+
+    def settle(self):
+        # finishes a pending fill before the rows are edited by index
+        if self._fill_job is not None:
+            scheduler.finish(self._fill_job)
+            self._fill_job = None
+
+    def on_toggle(self, index):
+        pass
+
+    def on_remove(self, index):
+        pass
+
+
+class StandingRow(BoxLayout):
+    rank = StringProperty("")
+    player = StringProperty("")
+    score = StringProperty("")
+    interval = StringProperty("")
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation="horizontal", **kwargs)
+        self.rank_label = Label(size_hint_x=None, width=SMALL_WIDTH)
+        self.player_label = Label()
+        self.score_label = Label(size_hint_x=None, width=SMALL_WIDTH)
+        self.interval_label = Label(size_hint_x=None, width=SMALL_WIDTH)
+        for label in (self.rank_label, self.player_label, self.score_label,
+                      self.interval_label):
+            self.add_widget(label)
+
+    def on_rank(self, _, rank):
+        self.rank_label.text = rank
+
+    def on_player(self, _, player):
+        self.player_label.text = player
+
+    def on_score(self, _, score):
+        self.score_label.text = score
+
+    def on_interval(self, _, interval):
+        self.interval_label.text = interval
+
+
+class StandingsView(RecycleView):
+    # a leaderboard of any length, only the visible rows are widgets
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        layout = RecycleBoxLayout(
+            orientation="vertical", size_hint_y=None,
+            default_size=(None, SMALL_HEIGHT), default_size_hint=(1, None)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.viewclass = StandingRow
+
+    def show(self, rows, intervals=None):
+        intervals = intervals or dict()
+        self.data = [
+            {"rank": str(rank), "player": player, "score": f"{score:.2f}",
+             "interval": _interval_text(intervals.get(player))}
+            for rank, player, score in rows
+        ]
+        self.scroll_y = 1
+
+    def set_intervals(self, intervals):
+        # fills in the intervals without moving the list
+        for row in self.data:
+            row["interval"] = _interval_text(intervals.get(row["player"]))
+        self.refresh_from_data()
+
+
+def _interval_text(interval):
+    if interval is None:
+        return ""
+    low, high = interval
+    return f"{low:.2f} – {high:.2f}"
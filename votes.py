@@ -0,0 +1,292 @@
+import struct
+from collections import namedtuple
+from itertools import starmap
+from typing import Optional
+
+# a vote on disk or on the wire: player, judgement and jury ids, then score
+VOTE_RECORD = struct.Struct("<HHHb")
+# the same record as a numpy structured dtype, packed to 7 bytes
+RECORD_DTYPE = [("player", "<u2"), ("judgement", "<u2"), ("jury", "<u2"),
+                ("score", "i1")]
+# an event of an EventLog: a board slot set from `previous` to `vote`, either
+# can be NO_VOTE (-1)
+EVENT_RECORD = struct.Struct("<HHHbb")
+EVENT_DTYPE = [("player", "<u2"), ("judgement", "<u2"), ("jury", "<u2"),
+               ("vote", "i1"), ("previous", "i1")]
+_pack_event = EVENT_RECORD.pack
+# the fewest events between two snapshots of an EventLog
+SNAPSHOT_EVERY = 256
+# events read at once when looking back for the start of a turn
+TURN_BLOCK = 4096
+
+Event = namedtuple("Event", ["player", "judgement", "jury", "vote",
+                             "previous"])
+
+
+class Vote:
+    # One vote as roster ids and a score, the names are looked up in the
+    # game rosters when needed.
+    __slots__ = ("player", "judgement", "jury", "score")
+
+    def __init__(self, player: int, judgement: int, jury: int, score: int):
+        self.player = player
+        self.judgement = judgement
+        self.jury = jury
+        self.score = score
+
+    def pack(self) -> bytes:
+        return VOTE_RECORD.pack(self.player, self.judgement, self.jury,
+                                self.score)
+
+    @classmethod
+    def unpack(cls, buffer, offset=0) -> "Vote":
+        return cls(*VOTE_RECORD.unpack_from(buffer, offset))
+
+    def __iter__(self):
+        yield self.player
+        yield self.judgement
+        yield self.jury
+        yield self.score
+
+    def __eq__(self, other):
+        if isinstance(other, Vote):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return (f"Vote({self.player}, {self.judgement}, {self.jury}, "
+                f"{self.score})")
+
+
+class VoteLog:
+    # The votes of a game in the order they were cast, as packed
+    # VOTE_RECORDs: 7 bytes a vote, serialized as is. Vote objects are only
+    # built when the log is read.
+    def __init__(self, records=b""):
+        if len(records) % VOTE_RECORD.size:
+            raise ValueError("truncated vote log")
+        self.records = bytearray(records)
+
+    def append(self, player: int, judgement: int, jury: int, score: int):
+        self.records += VOTE_RECORD.pack(player, judgement, jury, score)
+
+    def extend(self, players, judgements, jury, scores):
+        import numpy as np
+        rows = np.empty(len(scores), dtype=RECORD_DTYPE)
+        rows["player"] = players
+        rows["judgement"] = judgements
+        rows["jury"] = jury
+        rows["score"] = scores
+        self.records += rows.tobytes()
+
+    def clear(self):
+        del self.records[:]
+
+    def __len__(self):
+        return len(self.records) // VOTE_RECORD.size
+
+    def __getitem__(self, index) -> Vote:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(index)
+        return Vote.unpack(self.records, index * VOTE_RECORD.size)
+
+    def __iter__(self):
+        return starmap(Vote, VOTE_RECORD.iter_unpack(self.records))
+
+    def array(self):
+        # a structured copy with player, judgement, jury and score fields
+        import numpy as np
+        return np.frombuffer(bytes(self.records), dtype=RECORD_DTYPE)
+
+    def turn_start(self, judgement: int) -> int:
+        # the first event of the run of `judgement` events that ends the
+        # log, looked for backwards a block at a time
+        import numpy as np
+        stop = self._end
+        while stop:
+            start = max(0, stop - TURN_BLOCK)
+            other = np.flatnonzero(
+                self.array(start, stop)["judgement"] != judgement
+            )
+            if len(other):
+                return start + int(other[-1]) + 1
+            stop = start
+        return 0
+
+    def tobytes(self, start=0) -> bytes:
+        return bytes(self.records[start * EVENT_RECORD.size:])
+
+    @classmethod
+    def frombytes(cls, payload) -> "VoteLog":
+        return cls(payload)
+
+
+class EventLog:
+    # The votes of a game as an ordered log of events, each with the value
+    # it replaced: undoing an event is applying its reverse delta. Events
+    # before `position` are applied to the board, the ones after it were
+    # undone and can be redone until a new event drops them. Copies of the
+    # board votes are kept every `spacing` events so that the votes at any
+    # position are rebuilt from the nearest copy by at most spacing / 2
+    # events, the spacing grows with the board so that copies never take
+    # more than 4 bytes per event.
+    def __init__(self, votes=None):
+        self.reset(votes)
+
+    def reset(self, votes=None):
+        # starts over from `votes`, the board tensor that events are applied
+        # to, kept by reference
+        self.votes = votes
+        self.records = bytearray()
+        self.position = 0
+        self._end = 0
+        size = 0 if votes is None else votes.size
+        self.spacing = max(SNAPSHOT_EVERY, size // 4)
+        self._snapshots = dict() if votes is None else {0: votes.copy()}
+
+    def record(self, player: int, judgement: int, jury: int, vote: int,
+               previous: int):
+        end = self._end
+        if end != self.position:
+            self._drop_undone()
+            end = self._end
+        self.records += _pack_event(player, judgement, jury, vote, previous)
+        self.position = self._end = end = end + 1
+        if not end % self.spacing:
+            self._snapshots[end] = self.votes.copy()
+
+    def extend(self, players, judgements, jury, votes, previous):
+        import numpy as np
+        if self._end != self.position:
+            self._drop_undone()
+        rows = np.empty(len(votes), dtype=EVENT_DTYPE)
+        rows["player"] = players
+        rows["judgement"] = judgements
+        rows["jury"] = jury
+        rows["vote"] = votes
+        rows["previous"] = previous
+        self.records += rows.tobytes()
+        start = self._end
+        self.position = self._end = start + len(rows)
+        # a single copy for a batch, the one of its last spacing boundary
+        if self._end // self.spacing > start // self.spacing:
+            self._snapshots[self._end] = self.votes.copy()
+
+    def _drop_undone(self):
+        del self.records[self.position * EVENT_RECORD.size:]
+        self._end = self.position
+        for position in [p for p in self._snapshots if p > self.position]:
+            del self._snapshots[position]
+
+    def clear(self):
+        self.reset(self.votes)
+
+    @property
+    def can_undo(self) -> bool:
+        return self.position > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self.position < self._end
+
+    def undo(self) -> Optional[Event]:
+        # the event to take back, the caller applies its reverse delta
+        if not self.position:
+            return None
+        self.position -= 1
+        return self[self.position]
+
+    def redo(self) -> Optional[Event]:
+        if self.position == self._end:
+            return None
+        self.position += 1
+        return self[self.position - 1]
+
+    def __len__(self):
+        # every event recorded, the undone ones included
+        return self._end
+
+    def __getitem__(self, index) -> Event:
+        if index < 0:
+            index += self._end
+        if not 0 <= index < self._end:
+            raise IndexError(index)
+        return Event._make(EVENT_RECORD.unpack_from(
+            self.records, index * EVENT_RECORD.size
+        ))
+
+    def __iter__(self):
+        return map(Event._make, EVENT_RECORD.iter_unpack(self.records))
+
+    def array(self, start=0, stop=None):
+        # a structured copy of events start to stop - 1
+        import numpy as np
+        stop = self._end if stop is None else stop
+        return np.frombuffer(bytes(self.records[
+            start * EVENT_RECORD.size:stop * EVENT_RECORD.size
+        ]), dtype=EVENT_DTYPE)
+
+    def votes_at(self, position: int):
+        # a copy of the board votes once events 0 to position - 1 are
+        # applied, rebuilt from the nearest snapshot either side
+        if not 0 <= position <= self._end:
+            raise IndexError(position)
+        snapshots = dict(self._snapshots)
+        snapshots.setdefault(self.position, self.votes)
+        nearest = min(snapshots, key=lambda p: abs(p - position))
+        votes = snapshots[nearest].copy()
+        if nearest < position:
+            # forward, a slot ends at its last vote
+            self._apply(votes, self.array(nearest, position), "vote", -1)
+        elif nearest > position:
+            # backward, a slot ends at the value its first event replaced
+            self._apply(votes, self.array(position, nearest), "previous", 1)
+        return votes
+
+    @staticmethod
+    def _apply(votes, events, field, step):
+        import numpy as np
+        flat = np.ravel_multi_index(
+            (events["player"], events["judgement"], events["jury"]),
+            votes.shape
+        )[::step]
+        slots, first = np.unique(flat, return_index=True)
+        votes.ravel()[slots] = events[field][::step][first]
+
+    def turn_start(self, judgement: int) -> int:
+        # the first event of the run of `judgement` events that ends the
+        # log, looked for backwards a block at a time
+        import numpy as np
+        stop = self._end
+        while stop:
+            start = max(0, stop - TURN_BLOCK)
+            other = np.flatnonzero(
+                self.array(start, stop)["judgement"] != judgement
+            )
+            if len(other):
+                return start + int(other[-1]) + 1
+            stop = start
+        return 0
+
+    def tobytes(self, start=0) -> bytes:
+        return bytes(self.records[start * EVENT_RECORD.size:])
+
+    @classmethod
+    def frombytes(cls, payload, position, votes) -> "EventLog":
+        # the log of a board whose `votes` are at `position`, the starting
+        # votes are found back from the reverse deltas
+        if len(payload) % EVENT_RECORD.size:
+            raise ValueError("truncated event log")
+        log = cls(votes)
+        log.records = bytearray(payload)
+        log._end = len(payload) // EVENT_RECORD.size
+        if not 0 <= position <= log._end:
+            raise ValueError("event log position out of range")
+        log.position = position
+        log._snapshots = dict()
+        log._snapshots[0] = log.votes_at(0)
+        log._snapshots[position] = votes.copy()
+        return log